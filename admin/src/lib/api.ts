@@ -88,9 +88,10 @@ export interface ConnectorInput {
 
 export interface ConnectorList {
     items: Connector[];
-    total: number;
+    total: number | null;
     page: number;
     per_page: number;
+    next_cursor: string | null;
 }
 
 export interface UsageStats {
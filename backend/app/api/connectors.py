@@ -1,13 +1,18 @@
 """Connector CRUD API endpoints."""
 
+import asyncio
+import base64
+import json
 import logging
-from typing import List, Optional
-from datetime import date, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func
+from typing import List, Literal, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from sqlalchemy import select, update, delete, func, tuple_
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_db, engine
 from ..models.connector import Connector
 from ..models.usage import ConnectorUsage
 from ..schemas.connector import (
@@ -19,11 +24,16 @@ from ..schemas.connector import (
     UsageStats
 )
 from ..middleware.auth import verify_admin_key
-from ..services.auth import generate_api_key, hash_api_key
+from ..services.auth import generate_api_key, hash_api_key, invalidate_connector_cache
+from ..services.cache import admin_key_builder, get_cached_response, set_cached_response, invalidate_cache
+from ..config import get_settings
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 router = APIRouter(prefix="/connectors", tags=["Connectors"])
 
+_CONN_LIST_ADAPTER = TypeAdapter(List[ConnectorResponse])
+
 
 def generate_connector_id() -> str:
     """Generate a unique connector ID."""
@@ -31,40 +41,88 @@ def generate_connector_id() -> str:
     return f"conn_{secrets.token_hex(8)}"
 
 
+def encode_cursor(connector: Connector) -> str:
+    """Encode the (created_at, id) position of a connector as an opaque cursor."""
+    raw = json.dumps({"ts": connector.created_at.isoformat(), "id": connector.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor produced by encode_cursor. Raises 400 if malformed."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(data["ts"]), str(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("", response_model=ConnectorList)
 async def list_connectors(
+    request: Request,
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     is_active: Optional[bool] = None,
-    _: bool = Depends(verify_admin_key),
-    db: AsyncSession = Depends(get_db)
+    include_total: bool = True,
+    _: bool = Depends(verify_admin_key)
 ):
-    """List all connectors with pagination."""
-    offset = (page - 1) * per_page
-    
-    # Build query
-    query = select(Connector)
-    count_query = select(func.count(Connector.id))
+    """
+    List all connectors, newest first.
+    
+    Pass the returned `next_cursor` as `cursor` to fetch the following page
+    (keyset pagination). `page` is still accepted as an offset-based fallback
+    for small result sets. Set `include_total=false` to skip the count query.
+    Responses are cached in Redis until a connector is modified.
+    """
+    cache_key = admin_key_builder(request)
+    cached = await get_cached_response("connectors", cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    # Build query (Core rows: read-only, no identity map)
+    query = select(Connector.__table__)
+    count_query = select(func.count()).select_from(Connector)
     
     if is_active is not None:
         query = query.where(Connector.is_active == is_active)
         count_query = count_query.where(Connector.is_active == is_active)
     
-    # Get total count
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # Get items
-    query = query.offset(offset).limit(per_page).order_by(Connector.created_at.desc())
-    result = await db.execute(query)
-    connectors = result.scalars().all()
-    
-    return ConnectorList(
-        items=[ConnectorResponse.model_validate(c) for c in connectors],
+    # Page query
+    query = query.order_by(Connector.created_at.desc(), Connector.id.desc()).limit(per_page)
+    if cursor:
+        cursor_ts, cursor_id = decode_cursor(cursor)
+        query = query.where(tuple_(Connector.created_at, Connector.id) < tuple_(cursor_ts, cursor_id))
+    else:
+        query = query.offset((page - 1) * per_page)
+    
+    # Read-only: run count (COUNT(*), never ordered) and page concurrently
+    # on two pooled connections instead of the request-scoped session;
+    # without the total only the page connection is checked out
+    total = None
+    async with engine.connect() as page_conn:
+        if include_total:
+            async with engine.connect() as count_conn:
+                total_result, result = await asyncio.gather(
+                    count_conn.execute(count_query),
+                    page_conn.execute(query),
+                )
+            total = total_result.scalar()
+        else:
+            result = await page_conn.execute(query)
+        connectors = result.all()
+    
+    next_cursor = encode_cursor(connectors[-1]) if len(connectors) == per_page else None
+    
+    content = ConnectorList(
+        items=_CONN_LIST_ADAPTER.validate_python(connectors, from_attributes=True),
         total=total,
         page=page,
-        per_page=per_page
-    )
+        per_page=per_page,
+        next_cursor=next_cursor
+    ).model_dump_json()
+    await set_cached_response("connectors", cache_key, content, settings.connectors_cache_ttl)
+    
+    return Response(content=content, media_type="application/json")
 
 
 @router.post("", response_model=ConnectorCreateResponse)
@@ -107,6 +165,7 @@ async def create_connector(
     db.add(connector)
     await db.commit()
     await db.refresh(connector)
+    await invalidate_cache("connectors")
     
     logger.info(f"Created connector: {connector_id} ({data.name})")
     
@@ -121,14 +180,14 @@ async def create_connector(
 @router.get("/{connector_id}", response_model=ConnectorResponse)
 async def get_connector(
     connector_id: str,
-    _: bool = Depends(verify_admin_key),
-    db: AsyncSession = Depends(get_db)
+    _: bool = Depends(verify_admin_key)
 ):
     """Get connector details."""
-    result = await db.execute(
-        select(Connector).where(Connector.id == connector_id)
-    )
-    connector = result.scalar_one_or_none()
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            select(Connector.__table__).where(Connector.id == connector_id)
+        )
+        connector = result.one_or_none()
     
     if not connector:
         raise HTTPException(status_code=404, detail="Connector not found")
@@ -136,6 +195,53 @@ async def get_connector(
     return ConnectorResponse.model_validate(connector)
 
 
+# Nested update fields and the connector columns they map to
+NESTED_UPDATE_COLUMNS = {
+    "routing": {
+        "prefer": "routing_prefer",
+        "fallback": "routing_fallback",
+        "ollama_only": "routing_ollama_only",
+        "cloud_only": "routing_cloud_only",
+    },
+    "rate_limits": {
+        "per_minute": "rate_limit_per_minute",
+        "per_hour": "rate_limit_per_hour",
+        "burst": "burst_limit",
+    },
+    "quotas": {
+        "tokens_per_day": "tokens_per_day",
+        "tokens_per_month": "tokens_per_month",
+        "max_spend_per_day_usd": "max_spend_per_day_usd",
+        "max_spend_per_month_usd": "max_spend_per_month_usd",
+    },
+}
+
+
+def flatten_connector_update(data: ConnectorUpdate) -> dict:
+    """Flatten a ConnectorUpdate into column-name values for UPDATE."""
+    update_data = data.model_dump(exclude_unset=True)
+    values = {}
+    
+    # Handle nested objects
+    for field, columns in NESTED_UPDATE_COLUMNS.items():
+        nested = update_data.pop(field, None)
+        if nested:
+            for key, column in columns.items():
+                if key in nested:
+                    values[column] = nested[key]
+    
+    default_params = update_data.pop("default_params", None)
+    if default_params:
+        values["default_params"] = default_params
+    
+    # Apply remaining simple fields
+    for key, value in update_data.items():
+        if key in Connector.__table__.c:
+            values[key] = value
+    
+    return values
+
+
 @router.patch("/{connector_id}", response_model=ConnectorResponse)
 async def update_connector(
     connector_id: str,
@@ -144,48 +250,32 @@ async def update_connector(
     db: AsyncSession = Depends(get_db)
 ):
     """Update connector settings."""
+    values = flatten_connector_update(data)
+    if not values:
+        # Nothing to change (an empty SET list is invalid SQL); return the row as-is
+        result = await db.execute(
+            select(Connector.__table__).where(Connector.id == connector_id)
+        )
+        connector = result.one_or_none()
+        if not connector:
+            raise HTTPException(status_code=404, detail="Connector not found")
+        return ConnectorResponse.model_validate(connector)
+    
     result = await db.execute(
-        select(Connector).where(Connector.id == connector_id)
+        update(Connector)
+        .where(Connector.id == connector_id)
+        .values(**values)
+        .returning(*Connector.__table__.c)
+        .execution_options(synchronize_session=False)
     )
-    connector = result.scalar_one_or_none()
+    connector = result.one_or_none()
     
     if not connector:
         raise HTTPException(status_code=404, detail="Connector not found")
     
-    # Update fields
-    update_data = data.model_dump(exclude_unset=True)
-    
-    # Handle nested objects
-    if "routing" in update_data and update_data["routing"]:
-        routing = update_data.pop("routing")
-        connector.routing_prefer = routing.get("prefer", connector.routing_prefer)
-        connector.routing_fallback = routing.get("fallback", connector.routing_fallback)
-        connector.routing_ollama_only = routing.get("ollama_only", connector.routing_ollama_only)
-        connector.routing_cloud_only = routing.get("cloud_only", connector.routing_cloud_only)
-    
-    if "rate_limits" in update_data and update_data["rate_limits"]:
-        limits = update_data.pop("rate_limits")
-        connector.rate_limit_per_minute = limits.get("per_minute", connector.rate_limit_per_minute)
-        connector.rate_limit_per_hour = limits.get("per_hour", connector.rate_limit_per_hour)
-        connector.burst_limit = limits.get("burst", connector.burst_limit)
-    
-    if "quotas" in update_data and update_data["quotas"]:
-        quotas = update_data.pop("quotas")
-        connector.tokens_per_day = quotas.get("tokens_per_day", connector.tokens_per_day)
-        connector.tokens_per_month = quotas.get("tokens_per_month", connector.tokens_per_month)
-        connector.max_spend_per_day_usd = quotas.get("max_spend_per_day_usd", connector.max_spend_per_day_usd)
-        connector.max_spend_per_month_usd = quotas.get("max_spend_per_month_usd", connector.max_spend_per_month_usd)
-    
-    if "default_params" in update_data and update_data["default_params"]:
-        connector.default_params = update_data.pop("default_params")
-    
-    # Apply remaining simple fields
-    for key, value in update_data.items():
-        if hasattr(connector, key):
-            setattr(connector, key, value)
-    
     await db.commit()
-    await db.refresh(connector)
+    await invalidate_cache("connectors")
+    await invalidate_connector_cache(connector.api_key_hash)
     
     logger.info(f"Updated connector: {connector_id}")
     
@@ -200,15 +290,19 @@ async def delete_connector(
 ):
     """Delete a connector."""
     result = await db.execute(
-        select(Connector).where(Connector.id == connector_id)
+        delete(Connector)
+        .where(Connector.id == connector_id)
+        .returning(Connector.id, Connector.api_key_hash)
+        .execution_options(synchronize_session=False)
     )
-    connector = result.scalar_one_or_none()
+    connector = result.one_or_none()
     
     if not connector:
         raise HTTPException(status_code=404, detail="Connector not found")
     
-    await db.delete(connector)
     await db.commit()
+    await invalidate_cache("connectors")
+    await invalidate_connector_cache(connector.api_key_hash)
     
     logger.info(f"Deleted connector: {connector_id}")
     
@@ -231,10 +325,13 @@ async def regenerate_api_key(
         raise HTTPException(status_code=404, detail="Connector not found")
     
     # Generate new key
+    old_api_key_hash = connector.api_key_hash
     new_api_key = generate_api_key()
     connector.api_key_hash = hash_api_key(new_api_key)
     
     await db.commit()
+    await invalidate_cache("connectors")
+    await invalidate_connector_cache(old_api_key_hash)
     
     logger.info(f"Regenerated API key for connector: {connector_id}")
     
@@ -248,7 +345,7 @@ async def regenerate_api_key(
 @router.get("/{connector_id}/usage", response_model=UsageStats)
 async def get_connector_usage(
     connector_id: str,
-    period: str = Query("day", regex="^(day|week|month)$"),
+    period: Literal["day", "week", "month"] = "day",
     _: bool = Depends(verify_admin_key),
     db: AsyncSession = Depends(get_db)
 ):
@@ -261,7 +358,7 @@ async def get_connector_usage(
         raise HTTPException(status_code=404, detail="Connector not found")
     
     # Calculate date range
-    today = date.today()
+    today = datetime.now(timezone.utc).date()
     if period == "day":
         start_date = today
     elif period == "week":
@@ -279,7 +376,7 @@ async def get_connector_usage(
             func.sum(ConnectorUsage.tokens_output).label("tokens_output"),
             func.sum(ConnectorUsage.tokens_total).label("tokens_total"),
             func.sum(ConnectorUsage.cost_usd).label("cost_usd"),
-            func.avg(ConnectorUsage.avg_latency_ms).label("avg_latency_ms")
+            func.sum(ConnectorUsage.latency_sum_ms).label("latency_sum_ms")
         ).where(
             ConnectorUsage.connector_id == connector_id,
             ConnectorUsage.date >= start_date
@@ -297,5 +394,5 @@ async def get_connector_usage(
         tokens_output=row.tokens_output or 0,
         tokens_total=row.tokens_total or 0,
         cost_usd=float(row.cost_usd or 0),
-        avg_latency_ms=float(row.avg_latency_ms or 0)
+        avg_latency_ms=float((row.latency_sum_ms or 0) / row.requests_total) if row.requests_total else 0.0
     )
@@ -1,14 +1,19 @@
 """Node management API endpoints."""
 
-import json
+import hmac
 import logging
+import time
+import msgpack
 from datetime import datetime, timezone
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Header, Request
-from pydantic import BaseModel, Field
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 from ..middleware.auth import verify_admin_key
-from ..services.rate_limiter import get_redis
+from ..services.rate_limiter import get_redis_raw
+from ..services.nodes import ACTIVE_NODES_KEY, NODE_TTL_SECONDS, node_key, fetch_active_nodes, notify_nodes_changed
+from ..services.cache import admin_key_builder, get_cached_response, set_cached_response, invalidate_cache
 from ..config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -18,20 +23,24 @@ router = APIRouter(prefix="/nodes", tags=["Nodes"])
 
 class LoadInfo(BaseModel):
     """Node load information."""
+    model_config = ConfigDict(extra="forbid")
+    
     cpu: Optional[float] = None
     memory: Optional[float] = None
 
 
 class HeartbeatPayload(BaseModel):
     """Payload sent by Ollama nodes."""
+    model_config = ConfigDict(extra="forbid")
+    
     node_id: str = Field(..., description="Unique node identifier")
     cloudflare_url: Optional[str] = None
     ipv4: Optional[str] = None
     ipv6: Optional[str] = None
     port: int = Field(default=11434)
-    models: List[str] = Field(default=[])
+    models: List[str] = Field(default_factory=list)
     load: Optional[LoadInfo] = None
-    metadata: dict = Field(default={})
+    metadata: dict = Field(default_factory=dict)
 
 
 class NodeInfo(BaseModel):
@@ -49,6 +58,9 @@ class NodeInfo(BaseModel):
     failure_count: int = 0
 
 
+_NODE_LIST_ADAPTER = TypeAdapter(List[NodeInfo])
+
+
 @router.post("/heartbeat")
 async def register_heartbeat(
     payload: HeartbeatPayload,
@@ -59,36 +71,47 @@ async def register_heartbeat(
     Register or update a node's heartbeat.
     Called periodically by Ollama node agents.
     """
-    # Validate node secret
-    if x_node_secret != settings.node_secret:
+    # Validate node secret (constant-time compare)
+    if not hmac.compare_digest((x_node_secret or "").encode(), settings.node_secret.encode()):
         raise HTTPException(status_code=403, detail="Invalid node secret")
     
-    r = await get_redis()
-    node_key = f"node:{payload.node_id}"
+    r = await get_redis_raw()
     
     # Get connection IP as fallback
     connection_ip = request.client.host if request.client else None
     
-    # Build node data
+    # Build node data (native types, packed as a single MessagePack blob)
     node_data = {
         "node_id": payload.node_id,
         "cloudflare_url": payload.cloudflare_url or "",
         "ipv4": payload.ipv4 or connection_ip or "",
         "ipv6": payload.ipv6 or "",
-        "port": str(payload.port),
-        "models": json.dumps(payload.models),
-        "cpu_load": str(payload.load.cpu if payload.load else 0.0),
-        "memory_load": str(payload.load.memory if payload.load else 0.0),
+        "port": payload.port,
+        "cpu_load": payload.load.cpu if payload.load and payload.load.cpu is not None else 0.0,
+        "memory_load": payload.load.memory if payload.load and payload.load.memory is not None else 0.0,
         "status": "online",
         "last_seen": datetime.now(timezone.utc).isoformat(),
-        "active_jobs": "0",
-        "failure_count": "0",
-        "metadata": json.dumps(payload.metadata)
+        "active_jobs": 0,
+        "failure_count": 0,
     }
+    # Readers default missing models/metadata to empty, so skip encoding them
+    if payload.models:
+        node_data["models"] = payload.models
+    if payload.metadata:
+        node_data["metadata"] = payload.metadata
+    
+    # Store in Redis with TTL and index by heartbeat time; stale index
+    # entries are swept on every heartbeat
+    now = time.time()
+    pipe = r.pipeline(transaction=False)
+    pipe.set(node_key(payload.node_id), msgpack.packb(node_data), ex=NODE_TTL_SECONDS)
+    pipe.zadd(ACTIVE_NODES_KEY, {payload.node_id: now})
+    pipe.zremrangebyscore(ACTIVE_NODES_KEY, "-inf", now - NODE_TTL_SECONDS)
+    _, added, _ = await pipe.execute()
     
-    # Store in Redis with TTL
-    await r.hset(node_key, mapping=node_data)
-    await r.expire(node_key, 90)  # 90 second TTL
+    # A node (re)joining the index should be routable without waiting for the next refresh
+    if added:
+        await notify_nodes_changed()
     
     logger.info(f"Heartbeat from node {payload.node_id}: {len(payload.models)} models")
     
@@ -97,45 +120,41 @@ async def register_heartbeat(
 
 @router.get("", response_model=List[NodeInfo])
 async def list_nodes(
+    request: Request,
     _: bool = Depends(verify_admin_key)
 ):
-    """List all registered nodes."""
-    r = await get_redis()
-    
-    node_keys = await r.keys("node:*")
-    nodes = []
-    
-    for key in node_keys:
-        data = await r.hgetall(key)
-        if not data:
-            continue
-        
-        # Parse models JSON
-        models = []
-        if data.get("models"):
-            try:
-                models = json.loads(data["models"])
-            except:
-                pass
-        
-        nodes.append(NodeInfo(
-            node_id=data.get("node_id", key.replace("node:", "")),
-            cloudflare_url=data.get("cloudflare_url") or None,
-            ipv4=data.get("ipv4") or None,
-            ipv6=data.get("ipv6") or None,
-            port=int(data.get("port", 11434)),
-            models=models,
-            load=LoadInfo(
-                cpu=float(data.get("cpu_load", 0)),
-                memory=float(data.get("memory_load", 0))
-            ),
-            status=data.get("status", "unknown"),
-            last_seen=data.get("last_seen", ""),
-            active_jobs=int(data.get("active_jobs", 0)),
-            failure_count=int(data.get("failure_count", 0))
-        ))
-    
-    return nodes
+    """List all registered nodes. Cached briefly in Redis."""
+    cache_key = admin_key_builder(request)
+    cached = await get_cached_response("nodes", cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    # Nodes that heartbeated within the TTL, from the index (no keyspace scan)
+    rows = []
+    for data in await fetch_active_nodes():
+        rows.append({
+            "node_id": data["node_id"],
+            "cloudflare_url": data.get("cloudflare_url") or None,
+            "ipv4": data.get("ipv4") or None,
+            "ipv6": data.get("ipv6") or None,
+            "port": data.get("port", 11434),
+            "models": data.get("models", []),
+            "load": {
+                "cpu": data.get("cpu_load", 0.0),
+                "memory": data.get("memory_load", 0.0)
+            },
+            "status": data.get("status", "unknown"),
+            "last_seen": data.get("last_seen", ""),
+            "active_jobs": data.get("active_jobs", 0),
+            "failure_count": data.get("failure_count", 0)
+        })
+    
+    # Validate and serialize the whole list in one pass each
+    nodes = _NODE_LIST_ADAPTER.validate_python(rows)
+    content = _NODE_LIST_ADAPTER.dump_json(nodes)
+    await set_cached_response("nodes", cache_key, content, settings.nodes_cache_ttl)
+    
+    return Response(content=content, media_type="application/json")
 
 
 @router.delete("/{node_id}")
@@ -144,14 +163,19 @@ async def remove_node(
     _: bool = Depends(verify_admin_key)
 ):
     """Remove a node from the registry."""
-    r = await get_redis()
-    node_key = f"node:{node_id}"
+    r = await get_redis_raw()
     
-    deleted = await r.delete(node_key)
+    pipe = r.pipeline(transaction=False)
+    pipe.delete(node_key(node_id))
+    pipe.zrem(ACTIVE_NODES_KEY, node_id)
+    deleted, _ = await pipe.execute()
     
     if not deleted:
         raise HTTPException(status_code=404, detail="Node not found")
     
+    await invalidate_cache("nodes")
+    await notify_nodes_changed()
+    
     logger.info(f"Removed node: {node_id}")
     
     return {"message": "Node removed", "node_id": node_id}
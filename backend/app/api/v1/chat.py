@@ -1,36 +1,79 @@
 """OpenAI-compatible chat completions API."""
 
-import time
 import logging
-from datetime import date
+from datetime import datetime, timezone
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-from ...database import get_db
 from ...models.connector import Connector
-from ...models.usage import ConnectorUsage, RequestLog
 from ...schemas.chat import ChatCompletionRequest, ChatCompletionResponse
 from ...middleware.auth import get_current_connector
 from ...services.auth import is_model_allowed
 from ...services.rate_limiter import check_rate_limit
+from ...services.usage import record_usage, enqueue_request_log
+from ...services.providers import StreamStats
+from ...services.clock import monotonic, wall_seconds
 from ...services.router import get_router, AllProvidersFailedError
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+async def track_success(
+    connector_id: str,
+    model: str,
+    provider: Optional[str],
+    node_id: Optional[str],
+    tokens_in: int,
+    tokens_out: int,
+    start_time: float
+) -> None:
+    """Record usage counters and a request log for a completed request."""
+    latency_ms = int((monotonic() - start_time) * 1000)
+    now = datetime.now(timezone.utc)
+    
+    await record_usage(connector_id, now.date(), tokens_in, tokens_out, latency_ms)
+    enqueue_request_log(
+        connector_id=connector_id,
+        timestamp=now,
+        model=model,
+        provider=provider,
+        node_id=node_id,
+        tokens_input=tokens_in,
+        tokens_output=tokens_out,
+        latency_ms=latency_ms,
+        status="success"
+    )
+
+
+async def track_stream_success(
+    connector_id: str,
+    model: str,
+    stats: StreamStats,
+    start_time: float
+) -> None:
+    """Background task run once a streamed response has been fully sent."""
+    await track_success(
+        connector_id, model, stats.provider, stats.node_id,
+        stats.prompt_tokens, stats.completion_tokens, start_time
+    )
+
+
 @router.post("/chat/completions", response_model=ChatCompletionResponse)
 async def chat_completions(
     request: ChatCompletionRequest,
-    connector: Connector = Depends(get_current_connector),
-    db: AsyncSession = Depends(get_db)
+    connector: Connector = Depends(get_current_connector)
 ) -> ChatCompletionResponse:
     """
     OpenAI-compatible chat completions endpoint.
     
     Routes requests to Ollama nodes or OpenRouter based on connector settings.
+    With `stream=true` the completion is relayed as server-sent events and
+    usage is recorded after the last chunk.
     """
-    start_time = time.time()
+    start_time = monotonic()
     
     # 1. Validate model access
     if not is_model_allowed(connector, request.model):
@@ -67,20 +110,22 @@ async def chat_completions(
             request.max_tokens = defaults["max_tokens"]
     
     # 4. Route to provider
+    stats = StreamStats()
     try:
         llm_router = get_router()
-        response = await llm_router.route(connector, request)
+        if request.stream:
+            chunks = await llm_router.stream(connector, request, stats)
+        else:
+            response = await llm_router.route(connector, request)
     except AllProvidersFailedError as e:
         # Log failure
-        log_entry = RequestLog(
+        enqueue_request_log(
             connector_id=connector.id,
             model=request.model,
             status="error",
             error=str(e),
-            latency_ms=int((time.time() - start_time) * 1000)
+            latency_ms=int((monotonic() - start_time) * 1000)
         )
-        db.add(log_entry)
-        await db.commit()
         
         raise HTTPException(
             status_code=503,
@@ -90,59 +135,18 @@ async def chat_completions(
             }
         )
     
-    # 5. Track usage
-    latency_ms = int((time.time() - start_time) * 1000)
-    
-    # Update daily usage
-    today = date.today()
-    usage_result = await db.execute(
-        f"SELECT * FROM connector_usage WHERE connector_id = :cid AND date = :d",
-        {"cid": connector.id, "d": today}
-    )
-    usage = usage_result.first()
-    
-    tokens_in = response.usage.prompt_tokens
-    tokens_out = response.usage.completion_tokens
-    
-    if usage:
-        await db.execute(
-            """
-            UPDATE connector_usage 
-            SET requests_total = requests_total + 1,
-                requests_success = requests_success + 1,
-                tokens_input = tokens_input + :ti,
-                tokens_output = tokens_output + :to,
-                tokens_total = tokens_total + :tt
-            WHERE connector_id = :cid AND date = :d
-            """,
-            {"cid": connector.id, "d": today, "ti": tokens_in, "to": tokens_out, "tt": tokens_in + tokens_out}
-        )
-    else:
-        new_usage = ConnectorUsage(
-            connector_id=connector.id,
-            date=today,
-            requests_total=1,
-            requests_success=1,
-            tokens_input=tokens_in,
-            tokens_output=tokens_out,
-            tokens_total=tokens_in + tokens_out
+    if request.stream:
+        return StreamingResponse(
+            chunks,
+            media_type="text/event-stream",
+            background=BackgroundTask(track_stream_success, connector.id, request.model, stats, start_time)
         )
-        db.add(new_usage)
     
-    # Log request
-    log_entry = RequestLog(
-        connector_id=connector.id,
-        model=request.model,
-        provider=response.provider,
-        node_id=response.node_id,
-        tokens_input=tokens_in,
-        tokens_output=tokens_out,
-        latency_ms=latency_ms,
-        status="success"
+    # 5. Track usage (buffered in Redis, flushed to Postgres in the background)
+    await track_success(
+        connector.id, request.model, response.provider, response.node_id,
+        response.usage.prompt_tokens, response.usage.completion_tokens, start_time
     )
-    db.add(log_entry)
-    
-    await db.commit()
     
     return response
 
@@ -162,7 +166,7 @@ async def list_models(
             {
                 "id": model,
                 "object": "model",
-                "created": int(time.time()),
+                "created": wall_seconds(),
                 "owned_by": "ollama-connector"
             }
             for model in (connector.allowed_models or ["*"])
@@ -1,5 +1,6 @@
 """Database connection and session management."""
 
+from contextvars import ContextVar
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from .config import get_settings
@@ -11,8 +12,16 @@ settings = get_settings()
 engine = create_async_engine(
     settings.database_url,
     echo=False,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    connect_args={
+        # Short OLTP queries never benefit from JIT compilation
+        "server_settings": {"jit": "off"},
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+    },
 )
 
 # Session factory
@@ -28,10 +37,11 @@ class Base(DeclarativeBase):
     pass
 
 
+# Session shared by everything handling the current request; set by
+# DBSessionMiddleware. A pooled connection is only checked out on first use.
+request_session: ContextVar[AsyncSession] = ContextVar("request_session")
+
+
 async def get_db() -> AsyncSession:
-    """Dependency that provides a database session."""
-    async with async_session() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+    """Dependency that provides the request's database session."""
+    return request_session.get()
@@ -1,11 +1,20 @@
 """FastAPI main application."""
 
+import asyncio
+import contextlib
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api import router as api_router
+from .middleware.session import DBSessionMiddleware
 from .config import get_settings
+from .database import engine
+from .services.usage import flush_usage, flush_usage_loop, flush_request_logs, drain_request_logs
+from .services.auth import connector_invalidation_listener
+from .services.providers import close_providers
+from .services.nodes import node_snapshot_loop
+from .services.clock import wall_clock_loop
 
 settings = get_settings()
 
@@ -17,6 +26,40 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers, pre-warm the DB pool, and drain on shutdown."""
+    logger.info("🚀 Ollama Connector starting...")
+    logger.info(f"📡 OpenRouter: {'configured' if settings.openrouter_api_key else 'not configured'}")
+    
+    # Open one pooled connection up front so the first request skips connection setup
+    try:
+        async with engine.connect():
+            pass
+    except Exception as exc:
+        logger.warning(f"Database pool pre-warm failed: {exc}")
+    
+    tasks = (
+        asyncio.create_task(flush_usage_loop()),
+        asyncio.create_task(drain_request_logs()),
+        asyncio.create_task(connector_invalidation_listener()),
+        asyncio.create_task(node_snapshot_loop()),
+        asyncio.create_task(wall_clock_loop()),
+    )
+    
+    yield
+    
+    logger.info("👋 Ollama Connector shutting down...")
+    for task in tasks:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await flush_usage()
+    await flush_request_logs()
+    await close_providers()
+    await engine.dispose()
+
+
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
     
@@ -26,6 +69,7 @@ def create_app() -> FastAPI:
         version="1.0.0",
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
     
     # CORS middleware
@@ -41,6 +85,8 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    app.add_middleware(DBSessionMiddleware)
+    
     # Include API routes
     app.include_router(api_router)
     
@@ -59,15 +105,6 @@ def create_app() -> FastAPI:
             "health": "/healthz"
         }
     
-    @app.on_event("startup")
-    async def on_startup():
-        logger.info("🚀 Ollama Connector starting...")
-        logger.info(f"📡 OpenRouter: {'configured' if settings.openrouter_api_key else 'not configured'}")
-    
-    @app.on_event("shutdown")
-    async def on_shutdown():
-        logger.info("👋 Ollama Connector shutting down...")
-    
     return app
 
 
@@ -1,5 +1,6 @@
 """Middleware package."""
 
 from .auth import get_current_connector, get_optional_connector, verify_admin_key
+from .session import DBSessionMiddleware
 
-__all__ = ["get_current_connector", "get_optional_connector", "verify_admin_key"]
+__all__ = ["get_current_connector", "get_optional_connector", "verify_admin_key", "DBSessionMiddleware"]
@@ -1,5 +1,6 @@
 """Authentication middleware for API key validation."""
 
+import hmac
 from typing import Optional
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import APIKeyHeader
@@ -82,7 +83,8 @@ async def verify_admin_key(
             detail="Admin API key required. Use 'X-Admin-Key' header."
         )
     
-    if admin_key != settings.admin_api_key:
+    # Constant-time compare so response timing doesn't leak the key prefix
+    if not hmac.compare_digest(admin_key.encode(), settings.admin_api_key.encode()):
         raise HTTPException(
             status_code=403,
             detail="Invalid admin API key."
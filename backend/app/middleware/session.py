@@ -0,0 +1,29 @@
+"""Request-scoped database session middleware."""
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..database import async_session, request_session
+
+
+class DBSessionMiddleware:
+    """
+    Open one AsyncSession per HTTP request and expose it through
+    `request_session`, closing it once the response has been sent.
+    Plain ASGI so streaming responses are not buffered.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        session = async_session()
+        token = request_session.set(session)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_session.reset(token)
+            await session.close()
@@ -1,8 +1,8 @@
 """Connector SQLAlchemy model."""
 
-from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, BigInteger, Boolean, Float, DateTime
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, String, Text, Integer, BigInteger, Boolean, Float, DateTime, FetchedValue, Index, func
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import reconstructor
 from ..database import Base
 
 
@@ -19,9 +19,9 @@ class Connector(Base):
     name = Column(String(255), nullable=False)
     description = Column(Text)
     
-    # Access control
-    allowed_models = Column(JSONB, default=["*"])
-    blocked_models = Column(JSONB, default=[])
+    # Access control (TEXT[] with GIN indexes for containment queries)
+    allowed_models = Column(ARRAY(String), default=["*"])
+    blocked_models = Column(ARRAY(String), default=[])
     
     # Priority (1-10, higher = more priority)
     priority = Column(Integer, default=5)
@@ -50,8 +50,41 @@ class Connector(Base):
     tags = Column(JSONB, default=[])
     config_info = Column(JSONB, default={})
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
-    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by the update_connectors_updated_at trigger (scripts/init-db.sql)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), server_onupdate=FetchedValue())
+    
+    __table_args__ = (
+        # Keyset pagination for the connector list (ORDER BY created_at DESC, id DESC)
+        Index("idx_connectors_created_at_id", created_at.desc(), id.desc()),
+        # Same order restricted to active connectors (the default admin filter)
+        Index(
+            "idx_connectors_active_created_at_id",
+            created_at.desc(), id.desc(),
+            postgresql_where=is_active
+        ),
+        Index("idx_conn_allowed", allowed_models, postgresql_using="gin"),
+        Index("idx_conn_blocked", blocked_models, postgresql_using="gin"),
+        # Auth lookups, covering the columns checked on every request
+        Index(
+            "idx_active_keys",
+            api_key_hash,
+            postgresql_include=[
+                "id", "allowed_models", "blocked_models", "priority",
+                "routing_prefer", "routing_fallback", "routing_ollama_only", "routing_cloud_only",
+                "rate_limit_per_minute", "rate_limit_per_hour",
+            ],
+            postgresql_where=is_active
+        ),
+    )
+    
+    @reconstructor
+    def init_model_sets(self) -> None:
+        """Build the allow/block lookup sets used by is_model_allowed (once per load)."""
+        allowed = self.allowed_models or ["*"]
+        self._allow_all = "*" in allowed
+        self._allowed_set = frozenset(allowed)
+        self._blocked_set = frozenset(self.blocked_models or ())
     
     def __repr__(self) -> str:
         return f"<Connector {self.id}: {self.name}>"
@@ -1,7 +1,6 @@
 """Usage tracking SQLAlchemy model."""
 
-from datetime import datetime, date
-from sqlalchemy import Column, String, Integer, BigInteger, Float, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Date, DateTime, ForeignKey, Index, func
 from ..database import Base
 
 
@@ -29,11 +28,19 @@ class ConnectorUsage(Base):
     # Cost tracking
     cost_usd = Column(Float, default=0.0)
     
-    # Latency stats
-    avg_latency_ms = Column(Float, default=0.0)
+    # Latency stats (average = latency_sum_ms / requests_total, at read time)
+    latency_sum_ms = Column(BigInteger, default=0)
     
     __table_args__ = (
-        UniqueConstraint('connector_id', 'date', name='uix_connector_date'),
+        # One row per connector per day; also the usage upsert's conflict target
+        Index(
+            "uix_connector_date",
+            connector_id, date,
+            unique=True,
+            postgresql_include=["requests_total", "tokens_total", "cost_usd"]
+        ),
+        # Usage range aggregates: WHERE connector_id = ? AND date >= ?
+        Index("idx_usage_connector_date", connector_id, date.desc()),
     )
     
     def __repr__(self) -> str:
@@ -48,7 +55,7 @@ class RequestLog(Base):
     
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     connector_id = Column(String(50), ForeignKey("connectors.id", ondelete="SET NULL"), nullable=True)
-    timestamp = Column(DateTime(timezone=True), default=datetime.utcnow)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
     
     # Request info
     model = Column(String(100))
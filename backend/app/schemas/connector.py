@@ -112,9 +112,10 @@ class ConnectorCreateResponse(BaseModel):
 class ConnectorList(BaseModel):
     """Paginated list of connectors."""
     items: List[ConnectorResponse]
-    total: int
+    total: Optional[int] = None  # None when requested with include_total=false
     page: int
     per_page: int
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
 
 
 class UsageStats(BaseModel):
@@ -1,22 +1,48 @@
 """Services package."""
 
-from .auth import generate_api_key, hash_api_key, get_connector_by_api_key, is_model_allowed
+from .auth import generate_api_key, hash_api_key, get_connector_by_api_key, is_model_allowed, invalidate_connector_cache
 from .rate_limiter import check_rate_limit, get_rate_limit_info
-from .providers import UnifiedLLMProvider, get_openrouter_provider, get_ollama_provider
+from .providers import UnifiedLLMProvider, get_openrouter_provider, get_ollama_provider, close_providers
 from .router import SmartRouter, get_router, NoHealthyNodesError, AllProvidersFailedError
+from .nodes import fetch_active_nodes, get_node_snapshot, refresh_node_snapshot, node_snapshot_loop
+from .cache import admin_key_builder, get_cached_response, set_cached_response, invalidate_cache
+from .usage import (
+    record_usage,
+    enqueue_request_log,
+    flush_usage,
+    flush_usage_loop,
+    flush_request_logs,
+    drain_request_logs,
+)
 
 __all__ = [
     "generate_api_key",
     "hash_api_key",
     "get_connector_by_api_key",
     "is_model_allowed",
+    "invalidate_connector_cache",
     "check_rate_limit",
     "get_rate_limit_info",
     "UnifiedLLMProvider",
     "get_openrouter_provider",
     "get_ollama_provider",
+    "close_providers",
     "SmartRouter",
     "get_router",
     "NoHealthyNodesError",
     "AllProvidersFailedError",
+    "fetch_active_nodes",
+    "get_node_snapshot",
+    "refresh_node_snapshot",
+    "node_snapshot_loop",
+    "admin_key_builder",
+    "get_cached_response",
+    "set_cached_response",
+    "invalidate_cache",
+    "record_usage",
+    "enqueue_request_log",
+    "flush_usage",
+    "flush_usage_loop",
+    "flush_request_logs",
+    "drain_request_logs",
 ]
@@ -1,12 +1,31 @@
 """Authentication service for API key validation."""
 
+import asyncio
+import contextlib
 import hashlib
+import logging
 import secrets
 from typing import Optional
+from cachetools import TTLCache
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.connector import Connector
+from .rate_limiter import get_redis
+
+logger = logging.getLogger(__name__)
+
+# In-process cache of active connectors keyed by API key hash.
+# Entries are evicted across workers via Redis pub/sub when a connector changes.
+CONNECTOR_INVALIDATION_CHANNEL = "connectors:invalidate"
+# Wait between attempts to resubscribe after the channel connection drops
+RESUBSCRIBE_MIN_DELAY = 0.5
+RESUBSCRIBE_MAX_DELAY = 30.0
+_connector_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+# Raw API key -> SHA256 hex digest, so repeat callers skip hashing. The TTL
+# keeps rotated keys from lingering in memory indefinitely.
+_api_key_hash_cache: TTLCache = TTLCache(maxsize=4096, ttl=300)
 
 
 def generate_api_key(prefix: str = "sk-conn") -> str:
@@ -16,8 +35,12 @@ def generate_api_key(prefix: str = "sk-conn") -> str:
 
 
 def hash_api_key(api_key: str) -> str:
-    """Hash an API key using SHA256."""
-    return hashlib.sha256(api_key.encode()).hexdigest()
+    """Hash an API key using SHA256 (memoized for recently seen keys)."""
+    api_key_hash = _api_key_hash_cache.get(api_key)
+    if api_key_hash is None:
+        api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        _api_key_hash_cache[api_key] = api_key_hash
+    return api_key_hash
 
 
 async def get_connector_by_api_key(
@@ -27,16 +50,71 @@ async def get_connector_by_api_key(
     """
     Look up a connector by its API key.
     Returns None if not found or inactive.
+    Active connectors are cached in-process for up to 60 seconds.
     """
     api_key_hash = hash_api_key(api_key)
     
-    result = await db.execute(
-        select(Connector).where(
-            Connector.api_key_hash == api_key_hash,
-            Connector.is_active == True
+    connector = _connector_cache.get(api_key_hash)
+    if connector is not None:
+        return connector
+    
+    began = not db.in_transaction()
+    try:
+        result = await db.execute(
+            select(Connector).where(
+                Connector.api_key_hash == api_key_hash,
+                Connector.is_active == True
+            )
         )
-    )
-    return result.scalar_one_or_none()
+        connector = result.scalar_one_or_none()
+        
+        if connector is not None:
+            # Detach so the cached instance outlives this request's session
+            db.expunge(connector)
+            _connector_cache[api_key_hash] = connector
+    finally:
+        if began:
+            # The request session lives until the response is fully sent; end this
+            # read-only transaction so the connection goes back to the pool now
+            await db.rollback()
+    
+    return connector
+
+
+async def invalidate_connector_cache(api_key_hash: str) -> None:
+    """Evict a connector from this worker's cache and notify the other workers."""
+    _connector_cache.pop(api_key_hash, None)
+    r = await get_redis()
+    await r.publish(CONNECTOR_INVALIDATION_CHANNEL, api_key_hash)
+
+
+async def connector_invalidation_listener() -> None:
+    """
+    Background task: evict cached connectors announced on the invalidation channel.
+    Resubscribes with backoff if the Redis connection drops.
+    """
+    retry_delay = RESUBSCRIBE_MIN_DELAY
+    while True:
+        pubsub = None
+        try:
+            r = await get_redis()
+            pubsub = r.pubsub()
+            await pubsub.subscribe(CONNECTOR_INVALIDATION_CHANNEL)
+            # Invalidations sent while we were not subscribed are lost; start cold
+            _connector_cache.clear()
+            retry_delay = RESUBSCRIBE_MIN_DELAY
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _connector_cache.pop(message["data"], None)
+        except Exception:
+            logger.exception(f"Connector invalidation subscription failed, resubscribing in {retry_delay:.1f}s")
+            _connector_cache.clear()
+        finally:
+            if pubsub is not None:
+                with contextlib.suppress(Exception):
+                    await pubsub.aclose()
+        await asyncio.sleep(retry_delay)
+        retry_delay = min(retry_delay * 2, RESUBSCRIBE_MAX_DELAY)
 
 
 def is_model_allowed(connector: Connector, model: str) -> bool:
@@ -48,14 +126,14 @@ def is_model_allowed(connector: Connector, model: str) -> bool:
     - allowed_models can be ["*"] for all models
     - Otherwise, model must be in allowed_models list
     """
+    # Sets are built when the connector is loaded; build them for
+    # instances that were constructed in Python instead
+    if getattr(connector, "_allowed_set", None) is None:
+        connector.init_model_sets()
+    
     # Check blocked first
-    if connector.blocked_models:
-        if model in connector.blocked_models:
-            return False
+    if model in connector._blocked_set:
+        return False
     
     # Check allowed
-    allowed = connector.allowed_models or ["*"]
-    if "*" in allowed:
-        return True
-    
-    return model in allowed
+    return connector._allow_all or model in connector._allowed_set
@@ -0,0 +1,49 @@
+"""Redis-backed response cache for admin list endpoints."""
+
+from typing import Optional, Union
+from fastapi import Request
+
+from .auth import hash_api_key
+from .rate_limiter import get_redis_raw
+
+CACHE_PREFIX = "oc"
+
+
+def _namespace_key(namespace: str) -> str:
+    return f"{CACHE_PREFIX}:{namespace}"
+
+
+def admin_key_builder(request: Request) -> str:
+    """
+    Build a cache key from the request path and query string.
+    The admin key hash is included so cached responses never leak across keys.
+    """
+    admin_hash = hash_api_key(request.headers.get("X-Admin-Key", ""))
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    return f"{admin_hash}:{request.url.path}?{query}"
+
+
+async def get_cached_response(namespace: str, key: str) -> Optional[bytes]:
+    """Return the cached JSON body for a key (undecoded), or None on a miss."""
+    r = await get_redis_raw()
+    return await r.hget(_namespace_key(namespace), key)
+
+
+async def set_cached_response(namespace: str, key: str, content: Union[str, bytes], expire: int) -> None:
+    """
+    Cache a JSON body under a namespace.
+    Entries share one Redis hash per namespace so it can be invalidated with a
+    single DEL; the TTL is only set when the hash is first created.
+    """
+    r = await get_redis_raw()
+    namespace_key = _namespace_key(namespace)
+    pipe = r.pipeline()
+    pipe.hset(namespace_key, key, content)
+    pipe.expire(namespace_key, expire, nx=True)
+    await pipe.execute()
+
+
+async def invalidate_cache(namespace: str) -> None:
+    """Drop every cached response in a namespace."""
+    r = await get_redis_raw()
+    await r.delete(_namespace_key(namespace))
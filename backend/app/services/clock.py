@@ -0,0 +1,25 @@
+"""Cheap clocks for the request path."""
+
+import asyncio
+import time
+
+# Unix time at one-second granularity, kept fresh by wall_clock_loop
+_wall_seconds = int(time.time())
+
+
+def wall_seconds() -> int:
+    """Current Unix time in whole seconds (for `created` fields and ids)."""
+    return _wall_seconds
+
+
+def monotonic() -> float:
+    """Event loop clock, for measuring latencies."""
+    return asyncio.get_running_loop().time()
+
+
+async def wall_clock_loop(interval: float = 0.5) -> None:
+    """Background task: refresh the cached wall-clock second."""
+    global _wall_seconds
+    while True:
+        _wall_seconds = int(time.time())
+        await asyncio.sleep(interval)
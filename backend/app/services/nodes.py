@@ -0,0 +1,150 @@
+"""Redis-backed registry of live Ollama nodes."""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, Dict, List, Optional
+import msgpack
+
+from .rate_limiter import get_redis_raw
+from .providers import prune_ollama_providers
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Sorted set of node ids scored by last heartbeat (unix seconds)
+ACTIVE_NODES_KEY = "nodes:active"
+NODE_TTL_SECONDS = 90
+
+# Published when a node joins or is removed so every worker refreshes at once
+NODES_CHANGED_CHANNEL = "nodes:changed"
+# Longest wait between attempts to resubscribe after the channel connection drops
+RESUBSCRIBE_MAX_DELAY = 30.0
+
+
+class _NodeSnapshot:
+    """
+    In-process copy of the live nodes, swapped whole on every refresh.
+    Kept in routing order: least active jobs, then CPU load, then failures.
+    """
+    nodes: List[Dict[str, Any]] = []
+    ts: float = 0.0
+
+
+def node_key(node_id: str) -> str:
+    return f"node:{node_id}"
+
+
+async def fetch_active_nodes() -> List[Dict[str, Any]]:
+    """
+    Return the stored data of every node that heartbeated within the TTL.
+    One ZRANGEBYSCORE on the index plus one MGET, independent of node count.
+    """
+    r = await get_redis_raw()
+    node_ids = await r.zrangebyscore(ACTIVE_NODES_KEY, time.time() - NODE_TTL_SECONDS, "+inf")
+    if not node_ids:
+        return []
+    
+    results = await r.mget([b"node:" + node_id for node_id in node_ids])
+    
+    nodes = []
+    for node_id, raw in zip(node_ids, results):
+        if not raw:
+            continue
+        try:
+            data = msgpack.unpackb(raw, raw=False)
+        except (ValueError, msgpack.UnpackException):
+            logger.warning(f"Skipping undecodable node record: {node_id!r}")
+            continue
+        data.setdefault("node_id", node_id.decode())
+        nodes.append(data)
+    return nodes
+
+
+def build_node_url(node_data: Dict[str, Any]) -> str:
+    """Build the URL for an Ollama node."""
+    # Try Cloudflare URL first
+    cf_url = node_data.get("cloudflare_url")
+    if cf_url:
+        return cf_url.rstrip("/")
+    
+    # Try IPv4
+    ipv4 = node_data.get("ipv4")
+    port = node_data.get("port", "11434")
+    if ipv4:
+        return f"http://{ipv4}:{port}"
+    
+    # Try IPv6
+    ipv6 = node_data.get("ipv6")
+    if ipv6:
+        if ":" in ipv6 and not ipv6.startswith("["):
+            ipv6 = f"[{ipv6}]"
+        return f"http://{ipv6}:{port}"
+    
+    # Default to localhost (shouldn't happen)
+    return f"http://localhost:{port}"
+
+
+def _routing_key(node: Dict[str, Any]) -> tuple:
+    return (
+        node.get("active_jobs", 0),
+        node.get("cpu_load", 0.5),
+        node.get("failure_count", 0),
+    )
+
+
+def get_node_snapshot() -> List[Dict[str, Any]]:
+    """Live nodes in routing order as of the last refresh; no Redis I/O."""
+    return _NodeSnapshot.nodes
+
+
+async def refresh_node_snapshot() -> None:
+    nodes = await fetch_active_nodes()
+    for node in nodes:
+        # O(1) model checks and a ready-made URL for the routing path
+        node["models"] = frozenset(node.get("models", ()))
+        node["url"] = build_node_url(node)
+    nodes.sort(key=_routing_key)
+    _NodeSnapshot.nodes = nodes
+    _NodeSnapshot.ts = time.time()
+    # Without this the per-node client cache grows with every node ever seen
+    await prune_ollama_providers({node["url"] for node in nodes})
+
+
+async def notify_nodes_changed() -> None:
+    """Ask every worker to refresh its node snapshot now."""
+    r = await get_redis_raw()
+    await r.publish(NODES_CHANGED_CHANNEL, b"1")
+
+
+async def node_snapshot_loop(interval: Optional[float] = None) -> None:
+    """
+    Background task: refresh the node snapshot every `interval` seconds, or
+    immediately when a change is announced on NODES_CHANGED_CHANNEL.
+    Resubscribes with backoff if the Redis connection drops.
+    """
+    interval = interval or settings.node_snapshot_interval
+    retry_delay = interval
+    while True:
+        pubsub = None
+        try:
+            r = await get_redis_raw()
+            pubsub = r.pubsub()
+            await pubsub.subscribe(NODES_CHANGED_CHANNEL)
+            retry_delay = interval
+            while True:
+                try:
+                    await refresh_node_snapshot()
+                except Exception:
+                    logger.exception("Node snapshot refresh failed")
+                await pubsub.get_message(ignore_subscribe_messages=True, timeout=interval)
+        except Exception:
+            logger.exception(f"Node change subscription failed, resubscribing in {retry_delay:.1f}s")
+        finally:
+            if pubsub is not None:
+                with contextlib.suppress(Exception):
+                    await pubsub.aclose()
+        await asyncio.sleep(retry_delay)
+        retry_delay = min(retry_delay * 2, RESUBSCRIBE_MAX_DELAY)
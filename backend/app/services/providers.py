@@ -1,16 +1,30 @@
 """Unified LLM Provider that works with any OpenAI-compatible endpoint."""
 
-import time
 import logging
-from typing import Optional, Dict, Any
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Dict, Any, List, Set, Tuple
 import httpx
+import orjson
 
 from ..schemas.chat import ChatCompletionRequest, ChatCompletionResponse, ChatCompletionChoice, ChatMessage, UsageInfo
 from ..config import get_settings
+from .clock import monotonic, wall_seconds
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Bytes of a relayed stream kept to find the final usage event
+STREAM_TAIL_BYTES = 8192
+
+
+@dataclass
+class StreamStats:
+    """Filled in while a streamed completion is relayed, read once it ends."""
+    provider: Optional[str] = None
+    node_id: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
 
 class UnifiedLLMProvider:
     """
@@ -31,62 +45,54 @@ class UnifiedLLMProvider:
         self.extra_headers = headers or {}
         self.timeout = timeout
         self.name = name
+        # One pooled client per provider so connections (and TLS) are reused
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+                **self.extra_headers
+            }
+        )
+    
+    def _build_payload(self, request: ChatCompletionRequest) -> Dict[str, Any]:
+        """
+        Build the upstream request body in one serialization pass.
+        Optional parameters the client did not set (including Ollama
+        `options`) are left out.
+        """
+        return request.model_dump(exclude_none=True)
     
     async def chat_completion(
         self,
         request: ChatCompletionRequest
     ) -> ChatCompletionResponse:
         """Send chat completion request."""
-        start_time = time.time()
-        
-        # Build request payload
-        payload = {
-            "model": request.model,
-            "messages": [{"role": m.role, "content": m.content} for m in request.messages],
-            "stream": request.stream,
-        }
-        
-        # Add optional parameters
-        if request.temperature is not None:
-            payload["temperature"] = request.temperature
-        if request.max_tokens is not None:
-            payload["max_tokens"] = request.max_tokens
-        if request.top_p is not None:
-            payload["top_p"] = request.top_p
-        if request.stop is not None:
-            payload["stop"] = request.stop
-        
-        # Add Ollama-specific options if present
-        if request.options:
-            payload["options"] = request.options
+        start_time = monotonic()
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            **self.extra_headers
-        }
-        
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.base_url}/v1/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-            data = response.json()
+        response = await self._client.post(
+            f"{self.base_url}/v1/chat/completions",
+            content=orjson.dumps(self._build_payload(request))
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
         
-        latency_ms = int((time.time() - start_time) * 1000)
+        latency_ms = int((monotonic() - start_time) * 1000)
         logger.info(f"[{self.name}] Chat completion for {request.model} completed in {latency_ms}ms")
         
-        # Parse response to our schema
-        return ChatCompletionResponse(
-            id=data.get("id", f"chatcmpl-{int(time.time())}"),
-            created=data.get("created", int(time.time())),
+        # Build our schema without re-validating the OpenAI-shaped upstream payload
+        now = wall_seconds()
+        usage = data.get("usage") or {}
+        return ChatCompletionResponse.model_construct(
+            id=data.get("id", f"chatcmpl-{now}"),
+            created=data.get("created", now),
             model=data.get("model", request.model),
             choices=[
-                ChatCompletionChoice(
+                ChatCompletionChoice.model_construct(
                     index=c.get("index", 0),
-                    message=ChatMessage(
+                    message=ChatMessage.model_construct(
                         role=c["message"]["role"],
                         content=c["message"]["content"]
                     ),
@@ -94,38 +100,89 @@ class UnifiedLLMProvider:
                 )
                 for c in data.get("choices", [])
             ],
-            usage=UsageInfo(
-                prompt_tokens=data.get("usage", {}).get("prompt_tokens", 0),
-                completion_tokens=data.get("usage", {}).get("completion_tokens", 0),
-                total_tokens=data.get("usage", {}).get("total_tokens", 0)
+            usage=UsageInfo.model_construct(
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+                total_tokens=usage.get("total_tokens", 0)
             ),
             provider=self.name
         )
     
+    async def chat_completion_stream(
+        self,
+        request: ChatCompletionRequest,
+        stats: StreamStats
+    ) -> AsyncIterator[bytes]:
+        """
+        Relay a streamed chat completion verbatim (upstream is already OpenAI SSE).
+        Only the tail of the stream is kept, to read token counts from the final
+        `usage` event onto `stats` once the stream ends.
+        """
+        payload = self._build_payload(request)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        
+        tail = b""
+        async with self._client.stream(
+            "POST",
+            f"{self.base_url}/v1/chat/completions",
+            content=orjson.dumps(payload)
+        ) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                tail = (tail + chunk)[-STREAM_TAIL_BYTES:]
+                yield chunk
+        
+        self._read_stream_usage(tail, stats)
+    
+    @staticmethod
+    def _read_stream_usage(tail: bytes, stats: StreamStats) -> None:
+        for line in reversed(tail.split(b"\n")):
+            if line.startswith(b"data:") and b'"usage"' in line:
+                try:
+                    usage = orjson.loads(line[5:]).get("usage")
+                except orjson.JSONDecodeError:
+                    continue
+                if usage:
+                    stats.prompt_tokens = usage.get("prompt_tokens", 0)
+                    stats.completion_tokens = usage.get("completion_tokens", 0)
+                    return
+    
     async def list_models(self) -> list:
         """List available models from this provider."""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/v1/models",
-                    headers={"Authorization": f"Bearer {self.api_key}"}
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
+            response = await self._client.get(f"{self.base_url}/v1/models", timeout=10.0)
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            return data.get("data", [])
         except Exception as e:
             logger.warning(f"[{self.name}] Failed to list models: {e}")
             return []
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        await self._client.aclose()
 
 
 # ===== Pre-configured providers =====
 
+# Providers are cached so each upstream keeps one connection pool
+_openrouter_provider: Optional[UnifiedLLMProvider] = None
+_ollama_providers: Dict[str, UnifiedLLMProvider] = {}
+# Providers of nodes that left the snapshot, with the time they were dropped.
+# Closed once a request already holding one has had its full timeout to finish
+_retired_providers: List[Tuple[float, UnifiedLLMProvider]] = []
+
+
 def get_openrouter_provider() -> Optional[UnifiedLLMProvider]:
     """Get OpenRouter provider if configured."""
+    global _openrouter_provider
     if not settings.openrouter_api_key:
         return None
+    if _openrouter_provider is not None:
+        return _openrouter_provider
     
-    return UnifiedLLMProvider(
+    _openrouter_provider = UnifiedLLMProvider(
         base_url="https://openrouter.ai/api",
         api_key=settings.openrouter_api_key,
         headers={
@@ -135,13 +192,45 @@ def get_openrouter_provider() -> Optional[UnifiedLLMProvider]:
         timeout=settings.openrouter_request_timeout,
         name="openrouter"
     )
+    return _openrouter_provider
 
 
 def get_ollama_provider(base_url: str) -> UnifiedLLMProvider:
-    """Get Ollama provider for a specific node."""
-    return UnifiedLLMProvider(
-        base_url=base_url,
-        api_key="ollama",  # Placeholder, not used by Ollama
-        timeout=settings.ollama_request_timeout,
-        name="ollama"
-    )
+    """Get Ollama provider for a specific node (one per base URL)."""
+    provider = _ollama_providers.get(base_url)
+    if provider is None:
+        provider = UnifiedLLMProvider(
+            base_url=base_url,
+            api_key="ollama",  # Placeholder, not used by Ollama
+            timeout=settings.ollama_request_timeout,
+            name="ollama"
+        )
+        _ollama_providers[base_url] = provider
+    return provider
+
+
+async def prune_ollama_providers(live_urls: Set[str]) -> None:
+    """Retire providers for nodes no longer live and close those retired long enough."""
+    now = monotonic()
+    for base_url in [url for url in _ollama_providers if url not in live_urls]:
+        _retired_providers.append((now, _ollama_providers.pop(base_url)))
+    while _retired_providers and now - _retired_providers[0][0] >= settings.ollama_request_timeout:
+        _, provider = _retired_providers.pop(0)
+        try:
+            await provider.aclose()
+        except Exception as e:
+            logger.warning(f"[{provider.name}] Failed to close client for {provider.base_url}: {e}")
+
+
+async def close_providers() -> None:
+    """Close every cached provider's HTTP client (app shutdown)."""
+    global _openrouter_provider
+    providers = list(_ollama_providers.values())
+    providers.extend(provider for _, provider in _retired_providers)
+    if _openrouter_provider is not None:
+        providers.append(_openrouter_provider)
+    for provider in providers:
+        await provider.aclose()
+    _ollama_providers.clear()
+    _retired_providers.clear()
+    _openrouter_provider = None
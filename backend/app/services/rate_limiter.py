@@ -8,62 +8,108 @@ from ..config import get_settings
 
 settings = get_settings()
 
-# Redis connection pool
+# Redis connection pools
 redis_pool = None
+redis_raw_pool = None
+
+# Sliding-window check-and-add in one round trip, on fixed-window counters.
+# Each window is approximated from the current and previous buckets:
+# count = previous * weight + current, weight = unelapsed share of this bucket.
+# KEYS: minute, previous minute, hour, previous hour
+# ARGV: minute_weight, hour_weight, limit_minute, limit_hour, ttl_minute, ttl_hour
+SLIDING_WINDOW_LUA = """
+local minute_count = math.floor(
+    tonumber(redis.call('GET', KEYS[2]) or '0') * tonumber(ARGV[1])
+    + tonumber(redis.call('GET', KEYS[1]) or '0'))
+local hour_count = math.floor(
+    tonumber(redis.call('GET', KEYS[4]) or '0') * tonumber(ARGV[2])
+    + tonumber(redis.call('GET', KEYS[3]) or '0'))
+local allowed = 0
+if minute_count < tonumber(ARGV[3]) and hour_count < tonumber(ARGV[4]) then
+    redis.call('INCR', KEYS[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    redis.call('INCR', KEYS[3])
+    redis.call('EXPIRE', KEYS[3], ARGV[6])
+    allowed = 1
+end
+return {allowed, minute_count, hour_count}
+"""
+_sliding_window_script = None
+
+
+def _window_keys(connector_id: str, now: float) -> Tuple[list, float, float]:
+    """
+    Bucket keys for the current and previous minute/hour, plus the weight
+    applied to each previous bucket.
+    """
+    minute, minute_elapsed = divmod(now, 60)
+    hour, hour_elapsed = divmod(now, 3600)
+    keys = [
+        f"rl:{connector_id}:m:{int(minute)}",
+        f"rl:{connector_id}:m:{int(minute) - 1}",
+        f"rl:{connector_id}:h:{int(hour)}",
+        f"rl:{connector_id}:h:{int(hour) - 1}",
+    ]
+    return keys, 1 - minute_elapsed / 60, 1 - hour_elapsed / 3600
 
 
 async def get_redis() -> redis.Redis:
     """Get Redis connection."""
     global redis_pool
     if redis_pool is None:
-        redis_pool = redis.from_url(
+        redis_pool = redis.Redis(connection_pool=redis.BlockingConnectionPool.from_url(
             settings.redis_url,
+            max_connections=settings.redis_max_connections,
             encoding="utf-8",
             decode_responses=True
-        )
+        ))
     return redis_pool
 
 
+async def get_redis_raw() -> redis.Redis:
+    """
+    Get Redis connection that returns raw bytes. Preferred on hot paths that
+    never need str values (binary blobs, counters, cached response bodies).
+    """
+    global redis_raw_pool
+    if redis_raw_pool is None:
+        redis_raw_pool = redis.Redis(connection_pool=redis.BlockingConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            decode_responses=False
+        ))
+    return redis_raw_pool
+
+
 async def check_rate_limit(
     connector_id: str,
     limit_per_minute: int,
     limit_per_hour: int
 ) -> Tuple[bool, dict]:
     """
-    Check if a request is within rate limits using sliding window.
+    Check if a request is within rate limits using an approximated sliding
+    window over per-minute and per-hour counters.
     
     Returns:
         (is_allowed, info_dict)
         is_allowed: True if request is allowed
         info_dict: Contains remaining limits and reset times
     """
-    r = await get_redis()
+    global _sliding_window_script
+    r = await get_redis_raw()
+    if _sliding_window_script is None:
+        # EVALSHA, loading the script on first use (or after a SCRIPT FLUSH)
+        _sliding_window_script = r.register_script(SLIDING_WINDOW_LUA)
     now = time.time()
+    keys, minute_weight, hour_weight = _window_keys(connector_id, now)
     
-    # Keys for minute and hour windows
-    minute_key = f"rate:{connector_id}:minute"
-    hour_key = f"rate:{connector_id}:hour"
-    
-    # Clean old entries and count current
-    minute_start = now - 60
-    hour_start = now - 3600
-    
-    pipe = r.pipeline()
-    
-    # Remove old entries
-    pipe.zremrangebyscore(minute_key, 0, minute_start)
-    pipe.zremrangebyscore(hour_key, 0, hour_start)
-    
-    # Count current entries
-    pipe.zcard(minute_key)
-    pipe.zcard(hour_key)
-    
-    results = await pipe.execute()
-    minute_count = results[2]
-    hour_count = results[3]
-    
-    # Check limits
-    is_allowed = minute_count < limit_per_minute and hour_count < limit_per_hour
+    # Count and (if allowed) record this request atomically. Buckets are kept
+    # for two windows so they can serve as the previous bucket.
+    allowed, minute_count, hour_count = await _sliding_window_script(
+        keys=keys,
+        args=[minute_weight, hour_weight, limit_per_minute, limit_per_hour, 120, 7200]
+    )
+    is_allowed = bool(allowed)
     
     info = {
         "minute_remaining": max(0, limit_per_minute - minute_count - 1),
@@ -72,39 +118,23 @@ async def check_rate_limit(
         "hour_reset": int(now + 3600),
     }
     
-    if is_allowed:
-        # Add this request
-        pipe = r.pipeline()
-        pipe.zadd(minute_key, {str(now): now})
-        pipe.zadd(hour_key, {str(now): now})
-        pipe.expire(minute_key, 120)  # Keep for 2 minutes
-        pipe.expire(hour_key, 7200)   # Keep for 2 hours
-        await pipe.execute()
-    
     return is_allowed, info
 
 
 async def get_rate_limit_info(connector_id: str, limit_per_minute: int, limit_per_hour: int) -> dict:
     """Get current rate limit status without counting a request."""
-    r = await get_redis()
-    now = time.time()
-    
-    minute_key = f"rate:{connector_id}:minute"
-    hour_key = f"rate:{connector_id}:hour"
-    
-    minute_start = now - 60
-    hour_start = now - 3600
+    r = await get_redis_raw()
+    keys, minute_weight, hour_weight = _window_keys(connector_id, time.time())
     
-    pipe = r.pipeline()
-    pipe.zcount(minute_key, minute_start, now)
-    pipe.zcount(hour_key, hour_start, now)
-    results = await pipe.execute()
+    minute, minute_prev, hour, hour_prev = (int(v or 0) for v in await r.mget(keys))
+    minute_used = int(minute_prev * minute_weight + minute)
+    hour_used = int(hour_prev * hour_weight + hour)
     
     return {
-        "minute_used": results[0],
+        "minute_used": minute_used,
         "minute_limit": limit_per_minute,
-        "minute_remaining": max(0, limit_per_minute - results[0]),
-        "hour_used": results[1],
+        "minute_remaining": max(0, limit_per_minute - minute_used),
+        "hour_used": hour_used,
         "hour_limit": limit_per_hour,
-        "hour_remaining": max(0, limit_per_hour - results[1]),
+        "hour_remaining": max(0, limit_per_hour - hour_used),
     }
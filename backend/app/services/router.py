@@ -1,18 +1,21 @@
 """Smart router for directing requests to the best provider."""
 
 import logging
-from typing import Optional, List, Dict, Any
-import redis.asyncio as redis
+import re
+from typing import AsyncIterator, Optional, List, Dict, Any, Tuple
 
 from ..models.connector import Connector
 from ..schemas.chat import ChatCompletionRequest, ChatCompletionResponse
-from .providers import get_ollama_provider, get_openrouter_provider, UnifiedLLMProvider
-from .rate_limiter import get_redis
+from .providers import get_ollama_provider, get_openrouter_provider, UnifiedLLMProvider, StreamStats
+from .nodes import get_node_snapshot
 from ..config import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Markers of a free OpenRouter model, anywhere in the id (case-insensitive)
+_FREE_MODEL_RE = re.compile(r":free|/free|free:", re.IGNORECASE)
+
 
 class NoHealthyNodesError(Exception):
     """Raised when no healthy Ollama nodes are available."""
@@ -47,33 +50,14 @@ class SmartRouter:
         errors = []
         for provider_type in providers:
             try:
-                if provider_type == "ollama":
-                    # Try to get a healthy Ollama node
-                    node = await self._get_best_ollama_node(
-                        request.model,
-                        connector.priority
-                    )
-                    if node:
-                        provider = get_ollama_provider(node["url"])
-                        response = await provider.chat_completion(request)
-                        response.node_id = node["node_id"]
-                        return response
-                    else:
-                        logger.info(f"No Ollama nodes available for {request.model}")
-                        continue
-                
-                elif provider_type == "openrouter" and self.openrouter:
-                    response = await self.openrouter.chat_completion(request)
-                    return response
-                
-                elif provider_type == "openrouter:free" and self.openrouter:
-                    # Only use free models on OpenRouter
-                    if self._is_free_model(request.model):
-                        response = await self.openrouter.chat_completion(request)
-                        return response
-                    else:
-                        logger.info(f"Model {request.model} is not free, skipping openrouter:free")
-                        continue
+                selected = await self._select_provider(provider_type, connector, request)
+                if not selected:
+                    continue
+                provider, node_id = selected
+                response = await provider.chat_completion(request)
+                if node_id:
+                    response.node_id = node_id
+                return response
                         
             except Exception as e:
                 logger.warning(f"Provider {provider_type} failed: {e}")
@@ -83,6 +67,74 @@ class SmartRouter:
         # All providers failed
         raise AllProvidersFailedError(f"All providers failed: {errors}")
     
+    async def stream(
+        self,
+        connector: Connector,
+        request: ChatCompletionRequest,
+        stats: StreamStats
+    ) -> AsyncIterator[bytes]:
+        """
+        Open a streamed completion on the best available provider.
+        Falls back to the next provider until one produces its first chunk,
+        then returns an iterator over the SSE bytes.
+        """
+        providers = self._get_provider_order(connector)
+        
+        errors = []
+        for provider_type in providers:
+            try:
+                selected = await self._select_provider(provider_type, connector, request)
+                if not selected:
+                    continue
+                provider, node_id = selected
+                chunks = provider.chat_completion_stream(request, stats)
+                first = await chunks.__anext__()
+            except Exception as e:
+                logger.warning(f"Provider {provider_type} failed: {e}")
+                errors.append({"provider": provider_type, "error": str(e)})
+                continue
+            
+            stats.provider = provider.name
+            stats.node_id = node_id
+            return self._relay(first, chunks)
+        
+        raise AllProvidersFailedError(f"All providers failed: {errors}")
+    
+    @staticmethod
+    async def _relay(first: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        yield first
+        async for chunk in chunks:
+            yield chunk
+    
+    async def _select_provider(
+        self,
+        provider_type: str,
+        connector: Connector,
+        request: ChatCompletionRequest
+    ) -> Optional[Tuple[UnifiedLLMProvider, Optional[str]]]:
+        """Resolve a provider type to a provider and, for Ollama, the node id."""
+        if provider_type == "ollama":
+            # Try to get a healthy Ollama node
+            node = await self._get_best_ollama_node(
+                request.model,
+                connector.priority
+            )
+            if node:
+                return get_ollama_provider(node["url"]), node["node_id"]
+            logger.info(f"No Ollama nodes available for {request.model}")
+            return None
+        
+        if provider_type == "openrouter" and self.openrouter:
+            return self.openrouter, None
+        
+        if provider_type == "openrouter:free" and self.openrouter:
+            # Only use free models on OpenRouter
+            if self._is_free_model(request.model):
+                return self.openrouter, None
+            logger.info(f"Model {request.model} is not free, skipping openrouter:free")
+        
+        return None
+    
     def _get_provider_order(self, connector: Connector) -> List[str]:
         """Get ordered list of providers to try."""
         order = []
@@ -118,28 +170,15 @@ class SmartRouter:
         - Current load
         - Failure count
         - Request priority
-        """
-        r = await get_redis()
-        
-        # Get all active nodes from Redis
-        node_keys = await r.keys("node:*")
-        if not node_keys:
-            return None
         
-        candidates = []
-        for key in node_keys:
-            node_data = await r.hgetall(key)
-            if not node_data:
-                continue
-            
-            # Check if node has the requested model
-            models = node_data.get("models", "[]")
-            if isinstance(models, str):
-                import json
-                try:
-                    models = json.loads(models)
-                except:
-                    models = []
+        The snapshot is already sorted by (active_jobs, cpu_load, failure_count)
+        when it is refreshed, so the first eligible node is the best one.
+        Priority lowers every candidate's apparent load by the same amount and
+        so never changes the order.
+        """
+        for node_data in get_node_snapshot():
+            # Check if node has the requested model (a frozenset in the snapshot)
+            models = node_data["models"]
             
             # Check model availability
             if model not in models and "*" not in models:
@@ -150,55 +189,19 @@ class SmartRouter:
             if status != "online":
                 continue
             
-            # Build node info
-            node_id = node_data.get("node_id", key.replace("node:", ""))
-            candidates.append({
-                "node_id": node_id,
-                "url": self._build_node_url(node_data),
-                "active_jobs": int(node_data.get("active_jobs", 0)),
-                "cpu_load": float(node_data.get("cpu_load", 0.5)),
-                "failure_count": int(node_data.get("failure_count", 0)),
-            })
-        
-        if not candidates:
-            return None
-        
-        # Sort by: active_jobs (adjusted by priority), cpu_load, failure_count
-        candidates.sort(key=lambda n: (
-            n["active_jobs"] - (priority * 0.1),  # Higher priority = lower apparent load
-            n["cpu_load"],
-            n["failure_count"]
-        ))
-        
-        return candidates[0]
-    
-    def _build_node_url(self, node_data: Dict[str, Any]) -> str:
-        """Build the URL for an Ollama node."""
-        # Try Cloudflare URL first
-        cf_url = node_data.get("cloudflare_url")
-        if cf_url:
-            return cf_url.rstrip("/")
-        
-        # Try IPv4
-        ipv4 = node_data.get("ipv4")
-        port = node_data.get("port", "11434")
-        if ipv4:
-            return f"http://{ipv4}:{port}"
-        
-        # Try IPv6
-        ipv6 = node_data.get("ipv6")
-        if ipv6:
-            if ":" in ipv6 and not ipv6.startswith("["):
-                ipv6 = f"[{ipv6}]"
-            return f"http://{ipv6}:{port}"
+            return {
+                "node_id": node_data["node_id"],
+                "url": node_data["url"],
+                "active_jobs": node_data.get("active_jobs", 0),
+                "cpu_load": node_data.get("cpu_load", 0.5),
+                "failure_count": node_data.get("failure_count", 0),
+            }
         
-        # Default to localhost (shouldn't happen)
-        return f"http://localhost:{port}"
+        return None
     
     def _is_free_model(self, model: str) -> bool:
         """Check if a model is free on OpenRouter."""
-        free_patterns = [":free", "/free", "free:"]
-        return any(p in model.lower() for p in free_patterns)
+        return _FREE_MODEL_RE.search(model) is not None
 
 
 # Global router instance
@@ -0,0 +1,234 @@
+"""
+Usage accounting kept off the request path.
+
+Daily usage counters are buffered in Redis and flushed to Postgres in batches;
+request logs are queued in-process and bulk-loaded with COPY.
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.dialects.postgresql import insert
+
+from ..database import async_session, engine
+from ..models.usage import ConnectorUsage
+from ..config import get_settings
+from .rate_limiter import get_redis
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+USAGE_KEY_PREFIX = "usage:"
+USAGE_PENDING_KEY = "usage:pending"
+
+USAGE_FIELDS = (
+    "requests_total", "requests_success", "tokens_input", "tokens_output", "tokens_total",
+    "latency_sum_ms",
+)
+
+REQUEST_LOG_COLUMNS = (
+    "connector_id", "timestamp", "model", "provider", "node_id",
+    "tokens_input", "tokens_output", "latency_ms", "status", "error",
+)
+REQUEST_LOG_BATCH_SIZE = 500
+REQUEST_LOG_RETRY_MAX_DELAY = 30.0
+
+# Pending request_logs rows as tuples ordered like REQUEST_LOG_COLUMNS.
+# Bounded: when the database falls behind the oldest rows are dropped.
+_request_log_queue: "asyncio.Queue[Tuple[Any, ...]]" = asyncio.Queue(maxsize=settings.request_log_queue_size)
+_dropped_request_logs = 0
+
+
+def _usage_key(connector_id: str, day: date) -> str:
+    return f"{USAGE_KEY_PREFIX}{connector_id}:{day.isoformat()}"
+
+
+async def record_usage(
+    connector_id: str,
+    day: date,
+    tokens_in: int,
+    tokens_out: int,
+    latency_ms: int
+) -> None:
+    """Increment a connector's daily usage counters for one successful request."""
+    r = await get_redis()
+    key = _usage_key(connector_id, day)
+
+    pipe = r.pipeline(transaction=False)
+    pipe.hincrby(key, "requests_total", 1)
+    pipe.hincrby(key, "requests_success", 1)
+    pipe.hincrby(key, "tokens_input", tokens_in)
+    pipe.hincrby(key, "tokens_output", tokens_out)
+    pipe.hincrby(key, "tokens_total", tokens_in + tokens_out)
+    pipe.hincrby(key, "latency_sum_ms", latency_ms)
+    pipe.sadd(USAGE_PENDING_KEY, key)
+    await pipe.execute()
+
+
+def enqueue_request_log(**fields: Any) -> None:
+    """Queue a request_logs row; it is written by drain_request_logs."""
+    global _dropped_request_logs
+    fields.setdefault("timestamp", datetime.now(timezone.utc))
+    if _request_log_queue.full():
+        _request_log_queue.get_nowait()
+        _dropped_request_logs += 1
+    _request_log_queue.put_nowait(tuple(fields.get(column) for column in REQUEST_LOG_COLUMNS))
+
+
+def _requeue_request_logs(batch: List[Tuple[Any, ...]]) -> None:
+    """Put a batch back on the queue after a failed COPY, dropping its oldest rows if there is no room."""
+    global _dropped_request_logs
+    free = _request_log_queue.maxsize - _request_log_queue.qsize()
+    if _request_log_queue.maxsize and len(batch) > free:
+        _dropped_request_logs += len(batch) - free
+        batch = batch[len(batch) - free:]
+    for row in batch:
+        _request_log_queue.put_nowait(row)
+
+
+async def _take_usage(r) -> List[Dict[str, Any]]:
+    """Atomically read and clear every pending usage hash."""
+    keys = await r.spop(USAGE_PENDING_KEY, settings.usage_flush_batch_size)
+    rows = []
+    for key in keys or []:
+        pipe = r.pipeline(transaction=True)
+        pipe.hgetall(key)
+        pipe.delete(key)
+        counters, _ = await pipe.execute()
+        if not counters:
+            continue
+        connector_id, day = key[len(USAGE_KEY_PREFIX):].rsplit(":", 1)
+        rows.append({
+            "connector_id": connector_id,
+            "date": date.fromisoformat(day),
+            **{field: int(counters.get(field, 0)) for field in USAGE_FIELDS},
+        })
+    return rows
+
+
+async def _restore(r, usage_rows: List[Dict[str, Any]]) -> None:
+    """Put drained counters back into Redis after a failed flush."""
+    pipe = r.pipeline(transaction=False)
+    for row in usage_rows:
+        key = _usage_key(row["connector_id"], row["date"])
+        for field in USAGE_FIELDS:
+            pipe.hincrby(key, field, row[field])
+        pipe.sadd(USAGE_PENDING_KEY, key)
+    await pipe.execute()
+
+
+async def flush_usage() -> None:
+    """Apply buffered usage counters to Postgres."""
+    r = await get_redis()
+    usage_rows = await _take_usage(r)
+    if not usage_rows:
+        return
+
+    try:
+        async with async_session() as session:
+            stmt = insert(ConnectorUsage).values(usage_rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["connector_id", "date"],
+                set_={
+                    field: getattr(ConnectorUsage, field) + getattr(stmt.excluded, field)
+                    for field in USAGE_FIELDS
+                }
+            )
+            await session.execute(stmt)
+            await session.commit()
+    except Exception:
+        logger.exception("Usage flush failed, re-queueing buffered counters")
+        await _restore(r, usage_rows)
+        return
+
+    logger.debug(f"Flushed {len(usage_rows)} usage rows")
+
+
+async def flush_usage_loop(interval: Optional[float] = None) -> None:
+    """Background task: flush buffered usage every `interval` seconds."""
+    interval = interval or settings.usage_flush_interval
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush_usage()
+        except Exception:
+            logger.exception("Usage flush loop error")
+
+
+async def _copy_request_logs(batch: List[Tuple[Any, ...]]) -> bool:
+    """COPY one batch into request_logs; returns False (batch re-queued) on error."""
+    global _dropped_request_logs
+    if _dropped_request_logs:
+        logger.warning(f"Request log queue full, dropped {_dropped_request_logs} oldest rows")
+        _dropped_request_logs = 0
+    try:
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                "request_logs",
+                records=batch,
+                columns=REQUEST_LOG_COLUMNS
+            )
+    except Exception:
+        logger.exception(f"Request log COPY failed, re-queueing {len(batch)} rows")
+        _requeue_request_logs(batch)
+        return False
+    return True
+
+
+async def flush_request_logs() -> None:
+    """COPY every queued request log to Postgres, one batch at a time (shutdown)."""
+    while not _request_log_queue.empty():
+        batch = []
+        while len(batch) < REQUEST_LOG_BATCH_SIZE and not _request_log_queue.empty():
+            batch.append(_request_log_queue.get_nowait())
+        if not await _copy_request_logs(batch):
+            return
+
+
+async def drain_request_logs(interval: Optional[float] = None) -> None:
+    """
+    Background task: COPY queued request logs as soon as a full batch is
+    queued, or `interval` seconds after the first row of a partial batch.
+    """
+    interval = interval or settings.request_log_flush_interval
+    loop = asyncio.get_running_loop()
+    retry_delay = interval
+    while True:
+        batch: List[Tuple[Any, ...]] = []
+        copy: Optional["asyncio.Future[bool]"] = None
+        try:
+            batch.append(await _request_log_queue.get())
+            deadline = loop.time() + interval
+            while len(batch) < REQUEST_LOG_BATCH_SIZE:
+                if not _request_log_queue.empty():
+                    batch.append(_request_log_queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(_request_log_queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Shielded so shutdown cannot abort a COPY half-way through
+            copy = asyncio.ensure_future(_copy_request_logs(batch))
+            copied = await asyncio.shield(copy)
+        except asyncio.CancelledError:
+            # Shutting down: finish the in-flight COPY (it re-queues on failure),
+            # or hand the held rows back for flush_request_logs to write
+            if copy is not None:
+                await copy
+            elif batch:
+                _requeue_request_logs(batch)
+            raise
+        except Exception:
+            logger.exception("Request log drain error")
+            copied = False
+        if copied:
+            retry_delay = interval
+            continue
+        # The batch is back on the queue; give the database time to recover
+        await asyncio.sleep(retry_delay)
+        retry_delay = min(retry_delay * 2, REQUEST_LOG_RETRY_MAX_DELAY)
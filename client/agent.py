@@ -3,18 +3,23 @@
 from __future__ import annotations
 
 import asyncio
+import concurrent.futures
 import contextlib
-import json
 import logging
 import os
+import random
 import socket
-from typing import Any, Dict, Optional
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, Optional
 
 import httpx
+import orjson
 import psutil
-from fastapi import FastAPI, HTTPException, Header
-from fastapi.responses import Response
-from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Header, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel
 
 
 LOGGER = logging.getLogger("ollama_node")
@@ -29,6 +34,19 @@ NODE_ID = os.getenv("NODE_ID", socket.gethostname())
 NODE_SECRET = os.getenv("NODE_SECRET", "")
 CLOUDFLARE_URL = os.getenv("CLOUDFLARE_URL", None)
 
+# Keep-alive slightly under common reverse-proxy idle timeouts so pooled
+# connections survive between heartbeats without being reset underneath us
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=15.0)
+
+MODEL_FETCH_ATTEMPTS = 3
+
+JSON_HEADERS = {"content-type": "application/json"}
+
+_random = random.SystemRandom()
+
+# psutil and socket probes block; run them off the event loop on a small, bounded pool
+_PROBE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="probe")
+
 
 def configure_logging() -> None:
     logging.basicConfig(
@@ -40,9 +58,6 @@ def configure_logging() -> None:
 configure_logging()
 
 
-app = FastAPI(title="Ollama Node Agent", version="2.0.0")
-
-
 # ===== Schemas =====
 
 class LoadInfo(BaseModel):
@@ -50,24 +65,18 @@ class LoadInfo(BaseModel):
     memory: Optional[float] = None
 
 
-class HeartbeatPayload(BaseModel):
-    node_id: str
-    cloudflare_url: Optional[str] = None
-    ipv4: Optional[str] = None
-    ipv6: Optional[str] = None
-    port: int = NODE_PORT
-    models: list = []
-    load: Optional[LoadInfo] = None
-    metadata: dict = {}
+# ===== Helpers =====
 
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 5.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return _random.uniform(0, min(cap, base * (2 ** attempt)))
 
-# ===== Helpers =====
 
 async def get_http_client() -> httpx.AsyncClient:
     client: Optional[httpx.AsyncClient] = getattr(app.state, "http", None)
     if client is None:
         timeout = httpx.Timeout(120.0, connect=10.0)
-        client = httpx.AsyncClient(timeout=timeout)
+        client = httpx.AsyncClient(timeout=timeout, limits=HTTP_LIMITS, http2=True, trust_env=False)
         app.state.http = client
     return client
 
@@ -90,30 +99,96 @@ def detect_ipv6() -> Optional[str]:
         return None
 
 
-def gather_load_info() -> LoadInfo:
+IP_CACHE_TTL = 300.0
+_IP_CACHE: Dict[str, Any] = {"t": None, "v4": None, "v6": None}
+
+
+def detected_addresses() -> tuple[Optional[str], Optional[str]]:
+    """(ipv4, ipv6) of this host, re-probed at most every IP_CACHE_TTL seconds."""
+    now = time.monotonic()
+    if _IP_CACHE["t"] is None or now - _IP_CACHE["t"] >= IP_CACHE_TTL:
+        _IP_CACHE["v4"] = detect_ipv4()
+        _IP_CACHE["v6"] = detect_ipv6()
+        _IP_CACHE["t"] = now
+    return _IP_CACHE["v4"], _IP_CACHE["v6"]
+
+
+LOAD_CACHE_TTL = 2.0
+_LOAD_CACHE: Dict[str, Any] = {"t": 0.0, "val": None}
+
+# Linux reads /proc directly; psutil is the portable fallback
+USE_PROCFS = sys.platform == "linux"
+# Cumulative (busy, total) jiffies from the previous /proc/stat read
+_CPU_TIMES: Dict[str, int] = {"busy": 0, "total": 0}
+
+
+def read_cpu_load() -> Optional[float]:
+    """CPU utilisation ratio since the previous call (since boot on the first)."""
+    if USE_PROCFS:
+        try:
+            with open("/proc/stat", "rb", buffering=0) as f:
+                # "cpu  user nice system idle iowait irq softirq steal ..."
+                times = [int(value) for value in f.readline().split()[1:9]]
+            total = sum(times)
+            busy = total - times[3] - times[4]
+            busy_delta = busy - _CPU_TIMES["busy"]
+            total_delta = total - _CPU_TIMES["total"]
+            _CPU_TIMES["busy"], _CPU_TIMES["total"] = busy, total
+            return busy_delta / total_delta if total_delta > 0 else 0.0
+        except (OSError, ValueError, IndexError):
+            pass
     try:
-        cpu = psutil.cpu_percent(interval=None) / 100.0
+        return psutil.cpu_percent(interval=None) / 100.0
     except Exception:
-        cpu = None
+        return None
+
+
+def read_memory_load() -> Optional[float]:
+    """Used memory ratio from MemTotal/MemAvailable in /proc/meminfo."""
+    if USE_PROCFS:
+        try:
+            with open("/proc/meminfo", "rb", buffering=0) as f:
+                fields = f.read().split()
+            # Lines are "Key: value kB", so each value follows its key
+            total = int(fields[fields.index(b"MemTotal:") + 1])
+            available = int(fields[fields.index(b"MemAvailable:") + 1])
+            return 1.0 - available / total
+        except (OSError, ValueError, IndexError, ZeroDivisionError):
+            pass
     try:
-        memory = psutil.virtual_memory().percent / 100.0
+        return psutil.virtual_memory().percent / 100.0
     except Exception:
-        memory = None
-    return LoadInfo(cpu=cpu, memory=memory)
+        return None
+
+
+def gather_load_info() -> LoadInfo:
+    """Current CPU/memory load, reused for LOAD_CACHE_TTL seconds between probes."""
+    now = time.monotonic()
+    cached = _LOAD_CACHE["val"]
+    if cached is not None and now - _LOAD_CACHE["t"] < LOAD_CACHE_TTL:
+        return cached
+    load = LoadInfo(cpu=read_cpu_load(), memory=read_memory_load())
+    _LOAD_CACHE["t"] = now
+    _LOAD_CACHE["val"] = load
+    return load
 
 
 async def fetch_available_models(http: httpx.AsyncClient) -> list[str]:
     """Fetch models from Ollama."""
     url = f"{OLLAMA_BASE_URL.rstrip('/')}/api/tags"
-    try:
-        response = await http.get(url, timeout=5.0)
-        response.raise_for_status()
-        data = response.json()
-        models = [item.get("name") for item in data.get("models", []) if item.get("name")]
-        return models
-    except Exception as exc:
-        LOGGER.warning(f"Failed to fetch models: {exc}")
-        return []
+    for attempt in range(MODEL_FETCH_ATTEMPTS):
+        try:
+            response = await http.get(url, timeout=5.0)
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            models = [item.get("name") for item in data.get("models", []) if item.get("name")]
+            return models
+        except Exception as exc:
+            if attempt + 1 == MODEL_FETCH_ATTEMPTS:
+                LOGGER.warning(f"Failed to fetch models: {exc}")
+                return []
+            await asyncio.sleep(backoff_delay(attempt))
+    return []
 
 
 def get_cloudflare_url() -> Optional[str]:
@@ -130,84 +205,118 @@ def get_cloudflare_url() -> Optional[str]:
 
 # ===== Heartbeat =====
 
-async def send_heartbeat() -> None:
+def build_heartbeat_base() -> Dict[str, Any]:
+    """Heartbeat fields that never change for the life of the process."""
+    return {
+        "node_id": NODE_ID,
+        "port": NODE_PORT,
+        "metadata": {"hostname": socket.gethostname()},
+    }
+
+
+async def send_heartbeat() -> bool:
     http = await get_http_client()
-    models = await fetch_available_models(http)
-    load = gather_load_info()
-    cloudflare_url = get_cloudflare_url()
-
-    payload = HeartbeatPayload(
-        node_id=NODE_ID,
-        cloudflare_url=cloudflare_url,
-        ipv4=detect_ipv4(),
-        ipv6=detect_ipv6(),
-        port=NODE_PORT,
-        models=models,
-        load=load,
-        metadata={"hostname": socket.gethostname()},
+    loop = asyncio.get_running_loop()
+    (ipv4, ipv6), load, models = await asyncio.gather(
+        loop.run_in_executor(_PROBE_EXECUTOR, detected_addresses),
+        loop.run_in_executor(_PROBE_EXECUTOR, gather_load_info),
+        fetch_available_models(http),
     )
 
+    # Merge the volatile fields into the static base; the hub validates the shape
+    payload = {
+        **app.state.hb_base,
+        "cloudflare_url": get_cloudflare_url(),
+        "ipv4": ipv4,
+        "ipv6": ipv6,
+        "models": models,
+        "load": {"cpu": load.cpu, "memory": load.memory},
+    }
+
     url = f"{SERVER_URL.rstrip('/')}/api/nodes/heartbeat"
-    headers = {"X-Node-Secret": NODE_SECRET}
+    headers = {**JSON_HEADERS, "X-Node-Secret": NODE_SECRET}
     
     try:
-        response = await http.post(url, json=payload.model_dump(), headers=headers)
+        response = await http.post(url, content=orjson.dumps(payload), headers=headers)
         response.raise_for_status()
         LOGGER.debug(f"Heartbeat sent: {len(models)} models")
+        return True
     except Exception as exc:
         LOGGER.error(f"Heartbeat failed: {exc}")
+        return False
 
 
 async def heartbeat_loop() -> None:
-    await send_heartbeat()
+    # Scheduled against a monotonic deadline so time spent sending doesn't
+    # stretch the period; a late heartbeat fires at once without catching up
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()
+    failures = 0
     while True:
-        await asyncio.sleep(HEARTBEAT_INTERVAL)
-        await send_heartbeat()
+        if await send_heartbeat():
+            failures = 0
+            deadline = max(deadline + HEARTBEAT_INTERVAL, loop.time())
+            # Small jitter keeps nodes started together from staying in lock-step
+            delay = max(0.0, deadline - loop.time() + _random.uniform(-1, 1))
+        else:
+            # Retry sooner than the interval, jittered so nodes don't hit a recovering hub together
+            delay = backoff_delay(failures, base=1.0, cap=HEARTBEAT_INTERVAL)
+            failures += 1
+            deadline = loop.time() + delay
+        await asyncio.sleep(delay)
 
 
 # ===== Lifecycle =====
 
-@app.on_event("startup")
-async def on_startup() -> None:
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start the heartbeat loop; on shutdown stop it before closing the HTTP client."""
     LOGGER.info(f"Starting Ollama node agent {NODE_ID}")
     app.state.http = await get_http_client()
-    app.state.heartbeat_task = asyncio.create_task(heartbeat_loop())
+    app.state.hb_base = build_heartbeat_base()
+    heartbeat_task = asyncio.create_task(heartbeat_loop())
+    
+    yield
+    
+    LOGGER.info(f"Stopping Ollama node agent {NODE_ID}")
+    heartbeat_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await heartbeat_task
+    await app.state.http.aclose()
+    _PROBE_EXECUTOR.shutdown(wait=False)
 
 
-@app.on_event("shutdown")
-async def on_shutdown() -> None:
-    LOGGER.info(f"Stopping Ollama node agent {NODE_ID}")
-    heartbeat_task: Optional[asyncio.Task] = getattr(app.state, "heartbeat_task", None)
-    if heartbeat_task:
-        heartbeat_task.cancel()
-        with contextlib.suppress(asyncio.CancelledError):
-            await heartbeat_task
-    http: Optional[httpx.AsyncClient] = getattr(app.state, "http", None)
-    if http:
-        await http.aclose()
+app = FastAPI(title="Ollama Node Agent", version="2.0.0", lifespan=lifespan)
 
 
 # ===== API Endpoints =====
 
 @app.post("/v1/chat/completions")
-async def chat_completions(request: Dict[str, Any]) -> Response:
+async def chat_completions(request: Request) -> StreamingResponse:
     """
     OpenAI-compatible chat completions endpoint.
-    Proxies to local Ollama.
+    Proxies to local Ollama, relaying the response body as it is generated.
+    The request body is forwarded verbatim; Ollama validates it.
     """
     http = await get_http_client()
     url = f"{OLLAMA_BASE_URL.rstrip('/')}/v1/chat/completions"
+    body = await request.body()
     
     try:
-        response = await http.post(url, json=request)
-        return Response(
-            content=response.content,
-            media_type=response.headers.get("content-type", "application/json"),
-            status_code=response.status_code
-        )
-    except Exception as exc:
-        LOGGER.exception(f"Ollama request failed: {exc}")
+        upstream_request = http.build_request("POST", url, content=body, headers=JSON_HEADERS)
+        response = await http.send(upstream_request, stream=True)
+    except httpx.TransportError as exc:
+        # Only an unreachable/timed-out Ollama is ours to report; upstream
+        # error statuses and bodies are passed through unchanged below
+        LOGGER.warning(f"Ollama request failed: {exc!r}")
         raise HTTPException(status_code=502, detail=f"Ollama error: {exc}")
+    
+    return StreamingResponse(
+        response.aiter_bytes(),
+        media_type=response.headers.get("content-type", "application/json"),
+        status_code=response.status_code,
+        background=BackgroundTask(response.aclose)
+    )
 
 
 @app.get("/v1/models")
@@ -216,7 +325,6 @@ async def list_models() -> Dict[str, Any]:
     http = await get_http_client()
     models = await fetch_available_models(http)
     
-    import time
     return {
         "object": "list",
         "data": [
@@ -239,3 +347,17 @@ async def health() -> Dict[str, str]:
 @app.get("/healthz")
 async def healthz() -> Dict[str, str]:
     return {"status": "ok"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # One worker: every worker process runs its own heartbeat loop
+    uvicorn.run(
+        "agent:app",
+        host="0.0.0.0",
+        port=NODE_PORT,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
@@ -131,5 +131,5 @@ fi
 
 # Always export CLOUDFLARE_URL (even if empty) so Python can read it
 export CLOUDFLARE_URL
-exec uvicorn agent:app --host 0.0.0.0 --port "$NODE_PORT"
+exec uvicorn agent:app --host 0.0.0.0 --port "$NODE_PORT" --loop uvloop --http httptools
 
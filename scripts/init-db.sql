@@ -9,9 +9,9 @@ CREATE TABLE IF NOT EXISTS connectors (
     name VARCHAR(255) NOT NULL,
     description TEXT,
     
-    -- Access control (JSONB for flexibility)
-    allowed_models JSONB DEFAULT '["*"]'::jsonb,
-    blocked_models JSONB DEFAULT '[]'::jsonb,
+    -- Access control (native arrays, GIN-indexed below)
+    allowed_models TEXT[] DEFAULT ARRAY['*'],
+    blocked_models TEXT[] DEFAULT '{}',
     
     -- Priority (1-10, higher = more priority)
     priority INTEGER DEFAULT 5 CHECK (priority >= 1 AND priority <= 10),
@@ -63,11 +63,8 @@ CREATE TABLE IF NOT EXISTS connector_usage (
     -- Cost tracking (for paid models)
     cost_usd DECIMAL(10,4) DEFAULT 0,
     
-    -- Latency stats
-    avg_latency_ms DECIMAL(10,2) DEFAULT 0,
-    
-    -- Ensure one row per connector per day
-    UNIQUE(connector_id, date)
+    -- Latency stats (average = latency_sum_ms / requests_total, at read time)
+    latency_sum_ms BIGINT DEFAULT 0
 );
 
 -- Create request logs table (for debugging and analytics)
@@ -98,9 +95,20 @@ CREATE TABLE IF NOT EXISTS request_logs (
 );
 
 -- Create indexes for performance
-CREATE INDEX IF NOT EXISTS idx_connectors_api_key_hash ON connectors(api_key_hash);
+-- Auth lookups (api_key_hash = ? AND is_active), covering the fields checked per request
+CREATE INDEX IF NOT EXISTS idx_active_keys ON connectors(api_key_hash)
+    INCLUDE (id, allowed_models, blocked_models, priority, routing_prefer, routing_fallback,
+             routing_ollama_only, routing_cloud_only, rate_limit_per_minute, rate_limit_per_hour)
+    WHERE is_active;
 CREATE INDEX IF NOT EXISTS idx_connectors_is_active ON connectors(is_active);
-CREATE INDEX IF NOT EXISTS idx_usage_connector_date ON connector_usage(connector_id, date);
+CREATE INDEX IF NOT EXISTS idx_conn_allowed ON connectors USING GIN(allowed_models);
+CREATE INDEX IF NOT EXISTS idx_conn_blocked ON connectors USING GIN(blocked_models);
+CREATE INDEX IF NOT EXISTS idx_connectors_created_at_id ON connectors(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_connectors_active_created_at_id ON connectors(created_at DESC, id DESC) WHERE is_active;
+-- One row per connector per day; also the usage upsert's conflict target
+CREATE UNIQUE INDEX IF NOT EXISTS uix_connector_date ON connector_usage(connector_id, date)
+    INCLUDE (requests_total, tokens_total, cost_usd);
+CREATE INDEX IF NOT EXISTS idx_usage_connector_date ON connector_usage(connector_id, date DESC);
 CREATE INDEX IF NOT EXISTS idx_logs_connector ON request_logs(connector_id);
 CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON request_logs(timestamp);
 CREATE INDEX IF NOT EXISTS idx_logs_model ON request_logs(model);
@@ -138,7 +146,7 @@ INSERT INTO connectors (
     'Default Test Connector',
     'Default connector for testing. API Key: sk-conn-default-test-key-12345678',
     5,
-    '["*"]'::jsonb,
+    ARRAY['*'],
     100,
     1000
 ) ON CONFLICT (id) DO NOTHING;
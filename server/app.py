@@ -4,22 +4,28 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
-import json
+import dataclasses
+import functools
+import heapq
 import logging
 import os
+import random
+import time
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
 from uuid import uuid4
-from collections import deque
 
 import httpx
+import orjson
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import Response, FileResponse
+from fastapi.responses import Response, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 
-from schemas import HeartbeatPayload, JobDispatchPayload, JobRequest, NodeInfo
+from schemas import HeartbeatPayload, NodeInfo
 
 
 LOGGER = logging.getLogger("ollama_hub")
@@ -29,6 +35,52 @@ HEARTBEAT_TTL_SECONDS = int(os.getenv("HEARTBEAT_TTL_SECONDS", "90"))
 HEARTBEAT_OFFLINE_SECONDS = int(os.getenv("HEARTBEAT_OFFLINE_SECONDS", "180"))
 NODE_MAX_FAILURES = int(os.getenv("NODE_MAX_FAILURES", "3"))
 NODE_REQUEST_TIMEOUT = float(os.getenv("NODE_REQUEST_TIMEOUT", "120"))
+# Jobs in flight to any one node; further jobs for it wait instead of piling onto the pool
+NODE_MAX_CONCURRENCY = int(os.getenv("NODE_MAX_CONCURRENCY", "8"))
+# How long a job waits for a slot on a saturated node before trying the next one
+NODE_SLOT_TIMEOUT = float(os.getenv("NODE_SLOT_TIMEOUT", "30"))
+# Jobs are hedged across up to this many candidates; the first success wins
+JOB_FANOUT = int(os.getenv("JOB_FANOUT", "2"))
+# stream=false jobs: how long the newest attempt may go without answering before the
+# next candidate is also started; 0 starts them all at once (first success wins)
+HEDGE_DELAY_MS = float(os.getenv("HEDGE_DELAY_MS", "10000"))
+# Streaming jobs answer once generation starts, so by default they move to the next
+# candidate only on failure; set this to hedge them as well (0 = start all at once)
+STREAM_HEDGE_DELAY_MS = float(os.environ["STREAM_HEDGE_DELAY_MS"]) if os.getenv("STREAM_HEDGE_DELAY_MS") else None
+# How long shutdown waits for in-flight jobs before cancelling them
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "10"))
+# Comma-separated node base URLs to open pooled connections to at startup
+WARM_NODES = [url.strip().rstrip("/") for url in os.getenv("WARM_NODES", "").split(",") if url.strip()]
+
+# Connection pool to nodes: sized for fan-out to many nodes, keeping idle
+# connections long enough to be reused across dispatches
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "1024")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "256")),
+    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+)
+# Per-stage timeouts: fail fast on unreachable nodes and on pool exhaustion,
+# while leaving generation (read) as long as NODE_REQUEST_TIMEOUT
+HTTP_TIMEOUT = httpx.Timeout(
+    connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "2")),
+    read=float(os.getenv("HTTP_READ_TIMEOUT", str(NODE_REQUEST_TIMEOUT))),
+    write=float(os.getenv("HTTP_WRITE_TIMEOUT", str(NODE_REQUEST_TIMEOUT))),
+    pool=float(os.getenv("HTTP_POOL_TIMEOUT", "1")),
+)
+
+JSON_HEADERS = {"content-type": "application/json"}
+# Relayed node responses that carry no content-type of their own
+DEFAULT_MEDIA_TYPE = "application/json"
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+class ORJSONResponse(Response):
+    """JSON response rendered with orjson instead of Starlette's json.dumps."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
 
 
 def configure_logging() -> None:
@@ -41,7 +93,76 @@ def configure_logging() -> None:
 configure_logging()
 
 
-@dataclass
+@dataclass(frozen=True)
+class DispatchJob:
+    """A job ready to send to a node: its id and the serialized JSON body."""
+    job_id: str
+    body: bytes
+
+
+class NodeRelay:
+    """
+    Body iterator for a relayed node response that runs `on_finish` exactly once.
+
+    It runs when the body ends, when the node breaks off mid-body, or when the
+    client goes away. Nothing runs it if the body is never iterated, so the
+    response's background task also calls finish() (a no-op if already run).
+    """
+
+    __slots__ = ("_response", "_on_finish", "_finished")
+
+    def __init__(self, response: httpx.Response, on_finish: Callable[[bool], Awaitable[None]]) -> None:
+        self._response = response
+        self._on_finish = on_finish
+        self._finished = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        node_ok = True
+        try:
+            async for chunk in self._response.aiter_bytes():
+                yield chunk
+        except httpx.TransportError:
+            # The node broke off; a client disconnect is not held against it
+            node_ok = False
+            raise
+        finally:
+            await self.finish(node_ok)
+
+    async def finish(self, success: bool = True) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        await self._on_finish(success)
+
+
+def parse_job_request(raw: bytes) -> Dict[str, Any]:
+    """
+    Parse a /jobs body with a single orjson pass and check only the fields the
+    hub relies on (the JobRequest shape); everything else is left to the node.
+    """
+    try:
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError as exc:
+        raise HTTPException(status_code=422, detail=f"Invalid JSON body: {exc}")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=422, detail="Job request must be a JSON object")
+    for name in ("model", "prompt"):
+        if not isinstance(data.get(name), str):
+            raise HTTPException(status_code=422, detail=f"'{name}' must be a string")
+    if not isinstance(data.get("options", {}), dict):
+        raise HTTPException(status_code=422, detail="'options' must be an object")
+    if not isinstance(data.get("stream", True), bool):
+        raise HTTPException(status_code=422, detail="'stream' must be a boolean")
+    return data
+
+
+def build_dispatch_body(job_id: str, raw: bytes) -> bytes:
+    """Prepend job_id to the caller's JSON object without re-serializing it."""
+    # parse_job_request guarantees a non-empty object, so a member follows "{"
+    return b'{"job_id":' + orjson.dumps(job_id) + b"," + raw[raw.index(b"{") + 1:]
+
+
+@dataclass(slots=True)
 class RequestLog:
     """Log entry for API requests."""
     timestamp: datetime
@@ -57,21 +178,82 @@ class RequestLog:
     error: Optional[str] = None
     duration_ms: Optional[float] = None
 
-    def to_dict(self) -> Dict[str, Any]:
-        return {
-            "timestamp": self.timestamp.isoformat(),
-            "request_ip": self.request_ip,
-            "endpoint": self.endpoint,
-            "method": self.method,
-            "request_json": self.request_json,
-            "node_id": self.node_id,
-            "ip_version": self.ip_version,
-            "node_url": self.node_url,
-            "status_code": self.status_code,
-            "success": self.success,
-            "error": self.error,
-            "duration_ms": self.duration_ms,
-        }
+
+class RequestLogBuffer:
+    """Fixed-size ring of the most recent request logs; the oldest is overwritten when full."""
+
+    __slots__ = ("_entries", "_written")
+
+    def __init__(self, capacity: int) -> None:
+        self._entries: List[Optional[RequestLog]] = [None] * capacity
+        self._written = 0
+
+    def __len__(self) -> int:
+        return min(self._written, len(self._entries))
+
+    def append(self, entry: RequestLog) -> None:
+        # Never awaits, so appends from concurrent requests need no lock
+        self._entries[self._written % len(self._entries)] = entry
+        self._written += 1
+
+    def latest(self, limit: int) -> List[RequestLog]:
+        """Up to `limit` entries, most recent first."""
+        entries, capacity, written = self._entries, len(self._entries), self._written
+        count = min(max(limit, 0), len(self))
+        return [entries[(written - i) % capacity] for i in range(1, count + 1)]
+
+
+def build_node_url(node: NodeInfo, connection_type: str) -> str:
+    """
+    Build the URL for a node based on connection type.
+    
+    Args:
+        node: NodeInfo object containing connection details
+        connection_type: One of "cloudflare", "ipv4", or "ipv6"
+    
+    Returns:
+        Full URL to the node's execute endpoint
+    """
+    if connection_type == "cloudflare":
+        if not node.cloudflare_url:
+            raise ValueError("Node has no Cloudflare URL")
+        # Cloudflare URL should already be a full URL, just append /execute if needed
+        base_url = node.cloudflare_url.rstrip('/')
+        if not base_url.startswith('http'):
+            base_url = f"http://{base_url}"
+        return f"{base_url}/execute"
+    elif connection_type == "ipv4":
+        if not node.ipv4:
+            raise ValueError("Node has no IPv4 address")
+        host = node.ipv4
+        return f"http://{host}:{node.port}/execute"
+    elif connection_type == "ipv6":
+        if not node.ipv6:
+            raise ValueError("Node has no IPv6 address")
+        host = node.ipv6
+        # Format IPv6 addresses properly
+        if ":" in host and not host.startswith("["):
+            host = f"[{host}]"
+        return f"http://{host}:{node.port}/execute"
+    else:
+        raise ValueError(f"Unknown connection type: {connection_type}")
+
+
+def cpu_load(node: NodeInfo) -> float:
+    """Reported CPU load for scheduling; unknown load sorts as fully busy."""
+    load = node.load
+    if not load:
+        return 1.0
+    # Handle both dict and LoadInfo object
+    if isinstance(load, dict):
+        cpu = load.get("cpu")
+    else:
+        cpu = load.cpu
+    return cpu if cpu is not None else 1.0
+
+
+CONNECTION_TYPES = ("cloudflare", "ipv4", "ipv6")
+HEARTBEAT_FIELDS = tuple(HeartbeatPayload.model_fields)
 
 
 @dataclass
@@ -81,23 +263,59 @@ class NodeState:
     record: NodeInfo
     active_jobs: int = 0
     failure_count: int = 0
+    # "online", "degraded" or "offline". Lives here rather than on the record so
+    # dispatch and cleanup flip a single attribute; record.status is never updated
+    status: str = "online"
+    # (connection type, execute URL) in dispatch priority order:
+    # Cloudflare -> IPv4 -> IPv6. Rebuilt only when the record changes
+    strategies: Tuple[Tuple[str, str], ...] = ()
+    # record.model_dump(), rebuilt alongside strategies; to_dict overlays the
+    # fields that change between heartbeats
+    record_view: Dict[str, object] = field(default_factory=dict, repr=False, compare=False)
+    # time.monotonic() of the last heartbeat; record.last_seen is for display only
+    last_seen_mono: float = field(default_factory=time.monotonic)
+    # Serializes updates to this node only; unrelated nodes never contend
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False, compare=False)
+    # Caps jobs in flight to this node; held from dispatch until the relay finishes
+    semaphore: asyncio.Semaphore = field(
+        default_factory=lambda: asyncio.Semaphore(NODE_MAX_CONCURRENCY), repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        self.refresh_derived()
+
+    def refresh_derived(self) -> None:
+        """Rebuild state derived from the record; call whenever the record is replaced or bumped."""
+        strategies = []
+        for connection_type in CONNECTION_TYPES:
+            if connection_type == "cloudflare" and not (self.record.cloudflare_url or "").strip():
+                continue
+            try:
+                strategies.append((connection_type, build_node_url(self.record, connection_type)))
+            except ValueError:
+                continue
+        self.strategies = tuple(strategies)
+        self.record_view = self.record.model_dump(exclude_none=False)
 
     def bump_heartbeat(self, payload: HeartbeatPayload) -> None:
-        # Get all fields from payload, including cloudflare_url
-        payload_data = payload.model_dump(exclude_none=False)
-        # Create new NodeInfo with all fields to ensure cloudflare_url is included
-        self.record = NodeInfo(
-            **payload_data,
-            last_seen=datetime.now(timezone.utc),
-            status="online"
-        )
+        # Update the record in place (NodeInfo is not frozen) instead of
+        # re-validating a fresh copy; payload values are already validated
+        record = self.record
+        for name in HEARTBEAT_FIELDS:
+            setattr(record, name, getattr(payload, name))
+        record.last_seen = datetime.now(timezone.utc)
+        self.status = "online"
+        self.last_seen_mono = time.monotonic()
         self.failure_count = 0
+        self.refresh_derived()
 
     def to_dict(self) -> Dict[str, object]:
-        data = self.record.model_dump(exclude_none=False)
-        data["active_jobs"] = self.active_jobs
-        data["failure_count"] = self.failure_count
-        return data
+        return {
+            **self.record_view,
+            "status": self.status,
+            "active_jobs": self.active_jobs,
+            "failure_count": self.failure_count,
+        }
 
 
 class NodeDispatchError(RuntimeError):
@@ -110,7 +328,38 @@ class NodeDispatchError(RuntimeError):
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Ollama Hub", version="0.1.0")
+    @contextlib.asynccontextmanager
+    async def lifespan(app_: FastAPI) -> AsyncIterator[None]:  # pragma: no cover - lifecycle hook
+        LOGGER.info("Starting Ollama Hub server")
+        app_.state.http = httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS, http2=True, trust_env=False)
+        if WARM_NODES:
+            # Handshakes happen now instead of on each node's first job
+            await asyncio.gather(
+                *(app_.state.http.get(f"{base}/healthz", timeout=5.0) for base in WARM_NODES),
+                return_exceptions=True,
+            )
+        app_.state.cleanup_task = asyncio.create_task(_cleanup_loop(app_))
+
+        yield
+
+        # Stop background work before closing the client it may be using
+        LOGGER.info("Shutting down Ollama Hub server")
+        app_.state.cleanup_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await app_.state.cleanup_task
+        # Let running jobs finish relaying; cancel whatever outlives the grace period
+        inflight = set(app_.state.inflight)
+        if inflight:
+            LOGGER.info("Waiting up to %.0fs for %d in-flight job(s)", SHUTDOWN_GRACE_SECONDS, len(inflight))
+            _, still_running = await asyncio.wait(inflight, timeout=SHUTDOWN_GRACE_SECONDS)
+            if still_running:
+                LOGGER.warning("Cancelling %d job(s) still running at shutdown", len(still_running))
+                for task in still_running:
+                    task.cancel()
+                await asyncio.gather(*still_running, return_exceptions=True)
+        await app_.state.http.aclose()
+
+    app = FastAPI(title="Ollama Hub", version="0.1.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
     # Add CORS middleware to allow browser requests
     app.add_middleware(
@@ -121,267 +370,351 @@ def create_app() -> FastAPI:
         allow_headers=["*"],  # Allow all headers
     )
 
-    app.state.registry: Dict[str, NodeState] = {}
+    # Copy-on-write: readers use the current mapping without locking. Nodes
+    # joining or leaving publish a new mapping under registry_lock; updates to
+    # a single node take only that NodeState's own lock
+    app.state.registry: Mapping[str, NodeState] = MappingProxyType({})
     app.state.registry_lock = asyncio.Lock()
+    # model -> ids of registered nodes advertising it; only changed by reindex_node
+    app.state.model_index: Dict[str, Set[str]] = {}
     app.state.http: Optional[httpx.AsyncClient] = None
     app.state.cleanup_task: Optional[asyncio.Task] = None
-    # Request logs: keep last 1000 entries (FIFO)
-    app.state.request_logs: deque = deque(maxlen=1000)
-    app.state.logs_lock = asyncio.Lock()
+    # Tasks serving /jobs (including the relay of their response), awaited on shutdown
+    app.state.inflight: Set[asyncio.Task] = set()
+    # Earliest moment any node can next go offline or be evicted. Heartbeats
+    # only push deadlines later, so this stays a safe lower bound between scans
+    app.state.next_cleanup_at: Optional[float] = None  # time.monotonic() deadline
+    # Request logs: keep the last 1000 entries
+    app.state.request_logs = RequestLogBuffer(1000)
 
     # Mount static files for dashboard
     static_dir = os.path.join(os.path.dirname(__file__), "static")
     if os.path.exists(static_dir):
         app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
-    @app.on_event("startup")
-    async def on_startup() -> None:  # pragma: no cover - lifecycle hook
-        LOGGER.info("Starting Ollama Hub server")
-        timeout = httpx.Timeout(
-            NODE_REQUEST_TIMEOUT,
-            connect=10.0,
-            read=NODE_REQUEST_TIMEOUT,
-            write=NODE_REQUEST_TIMEOUT,
-            pool=NODE_REQUEST_TIMEOUT,
-        )
-        app.state.http = httpx.AsyncClient(timeout=timeout)
-        app.state.cleanup_task = asyncio.create_task(_cleanup_loop(app))
-
-    @app.on_event("shutdown")
-    async def on_shutdown() -> None:  # pragma: no cover - lifecycle hook
-        LOGGER.info("Shutting down Ollama Hub server")
-        if app.state.cleanup_task:
-            app.state.cleanup_task.cancel()
-            with contextlib.suppress(asyncio.CancelledError):
-                await app.state.cleanup_task
-        if app.state.http:
-            await app.state.http.aclose()
-
-    async def registry_snapshot() -> Dict[str, NodeState]:
-        async with app.state.registry_lock:
-            return dict(app.state.registry)
-
-    def build_node_url(node: NodeInfo, connection_type: str) -> str:
-        """
-        Build the URL for a node based on connection type.
-        
-        Args:
-            node: NodeInfo object containing connection details
-            connection_type: One of "cloudflare", "ipv4", or "ipv6"
-        
-        Returns:
-            Full URL to the node's execute endpoint
-        """
-        if connection_type == "cloudflare":
-            if not node.cloudflare_url:
-                raise ValueError("Node has no Cloudflare URL")
-            # Cloudflare URL should already be a full URL, just append /execute if needed
-            base_url = node.cloudflare_url.rstrip('/')
-            if not base_url.startswith('http'):
-                base_url = f"http://{base_url}"
-            return f"{base_url}/execute"
-        elif connection_type == "ipv4":
-            if not node.ipv4:
-                raise ValueError("Node has no IPv4 address")
-            host = node.ipv4
-            return f"http://{host}:{node.port}/execute"
-        elif connection_type == "ipv6":
-            if not node.ipv6:
-                raise ValueError("Node has no IPv6 address")
-            host = node.ipv6
-            # Format IPv6 addresses properly
-            if ":" in host and not host.startswith("["):
-                host = f"[{host}]"
-            return f"http://{host}:{node.port}/execute"
-        else:
-            raise ValueError(f"Unknown connection type: {connection_type}")
-
-    async def mark_job_start(node_id: str) -> None:
-        async with app.state.registry_lock:
-            entry = app.state.registry.get(node_id)
-            if entry:
-                entry.active_jobs += 1
-
-    async def mark_job_end(node_id: str, success: bool) -> None:
-        async with app.state.registry_lock:
-            entry = app.state.registry.get(node_id)
-            if not entry:
-                return
+    def registry_snapshot() -> Mapping[str, NodeState]:
+        return app.state.registry
+
+    def publish_registry(registry: Dict[str, NodeState]) -> None:
+        """Swap in a new registry mapping. Caller holds registry_lock."""
+        app.state.registry = MappingProxyType(registry)
+
+    def reindex_node(node_id: str, old_models: Iterable[str], new_models: Iterable[str]) -> None:
+        """Move a node between model_index buckets (never awaits, so each call is atomic)."""
+        index = app.state.model_index
+        old_models, new_models = set(old_models), set(new_models)
+        for model in old_models - new_models:
+            bucket = index.get(model)
+            if bucket is not None:
+                bucket.discard(node_id)
+                if not bucket:
+                    del index[model]
+        for model in new_models - old_models:
+            index.setdefault(model, set()).add(node_id)
+
+    def release_job(node_id: str) -> None:
+        """Drop an abandoned job without touching failure bookkeeping (no await, so atomic)."""
+        entry = app.state.registry.get(node_id)
+        if entry:
             entry.active_jobs = max(entry.active_jobs - 1, 0)
+
+    async def mark_job_end(node_id: str, success: bool, release: bool = True) -> None:
+        """Record a dispatch outcome; `release=False` keeps the job active for another attempt."""
+        entry = app.state.registry.get(node_id)
+        if not entry:
+            return
+        async with entry.lock:
+            if release:
+                entry.active_jobs = max(entry.active_jobs - 1, 0)
             if success:
                 entry.failure_count = 0
-                if entry.record.status != "online":
-                    entry.record = entry.record.copy(update={"status": "online"})
+                entry.status = "online"
                 return
             entry.failure_count += 1
             if entry.failure_count >= NODE_MAX_FAILURES:
                 LOGGER.warning("Marking node %s as degraded after %s failures", node_id, entry.failure_count)
-                entry.record = entry.record.copy(update={"status": "degraded"})
+                entry.status = "degraded"
 
     async def choose_node_ids(model: str) -> List[str]:
-        async with app.state.registry_lock:
-            candidates = [
-                (node_id, entry)
-                for node_id, entry in app.state.registry.items()
-                if model in entry.record.models and entry.record.status == "online"
-            ]
-        
-        def get_cpu_load(item):
-            """Extract CPU load value, handling both dict and object cases."""
-            load = item[1].record.load
-            if not load:
-                return 1.0
-            # Handle both dict and LoadInfo object
-            if isinstance(load, dict):
-                return load.get("cpu", 1.0) if load.get("cpu") is not None else 1.0
-            else:
-                return load.cpu if load.cpu is not None else 1.0
-        
-        candidates.sort(
-            key=lambda item: (
-                item[1].active_jobs,
-                get_cpu_load(item),
-                item[1].failure_count,
-            )
-        )
-        return [node_id for node_id, _ in candidates]
-
-    async def snapshot_node(node_id: str) -> Optional[NodeInfo]:
-        async with app.state.registry_lock:
-            entry = app.state.registry.get(node_id)
-            if not entry:
-                return None
-            snapshot = entry.record.copy(deep=True)
-            # Ensure cloudflare_url is preserved
-            if hasattr(entry.record, 'cloudflare_url'):
-                snapshot.cloudflare_url = entry.record.cloudflare_url
-            return snapshot
-
-    async def dispatch_to_node(node_id: str, payload: JobDispatchPayload, log_entry: Optional[RequestLog] = None) -> Response:
+        """Best candidates for `model`, least loaded first (at most NODE_MAX_FAILURES + 1)."""
+        registry = registry_snapshot()
+        keyed = []
+        for node_id in app.state.model_index.get(model, ()):
+            entry = registry.get(node_id)
+            if entry and entry.status == "online":
+                # Saturated nodes sort last: a job sent there would queue for a slot
+                keyed.append((entry.semaphore.locked(), entry.active_jobs, cpu_load(entry.record), entry.failure_count, node_id))
+        # Callers rarely get past the first few nodes, so only order those
+        best = heapq.nsmallest(NODE_MAX_FAILURES + 1, keyed)
+        return [key[-1] for key in best]
+
+    async def finish_stream(node_id: str, response: httpx.Response, semaphore: asyncio.Semaphore, success: bool) -> None:
+        # Slot and job count first: neither may be lost if what follows is cancelled
+        semaphore.release()
+        release_job(node_id)
+        try:
+            await response.aclose()
+        finally:
+            await mark_job_end(node_id, success=success, release=False)
+
+    async def begin_dispatch(node_id: str) -> Optional[NodeState]:
+        """Count a job against the node and return its state, in one critical section."""
+        entry = app.state.registry.get(node_id)
+        if not entry:
+            return None
+        async with entry.lock:
+            entry.active_jobs += 1
+            return entry
+
+    async def dispatch_to_node(node_id: str, payload: DispatchJob, log_entry: Optional[RequestLog] = None) -> Response:
         http = app.state.http
         if http is None:  # pragma: no cover - startup invariant
             raise RuntimeError("HTTP client not initialised")
 
-        node_snapshot = await snapshot_node(node_id)
-        if not node_snapshot:
+        entry = await begin_dispatch(node_id)
+        if entry is None:
             raise NodeDispatchError(node_id, "Node disappeared before dispatch", status_code=410)
 
-        # CRITICAL: Build connection strategies FRESH for EVERY request
-        # Priority order MUST be: Cloudflare -> IPv4 -> IPv6
-        # This ensures Cloudflare is tried FIRST for every single request
-        
-        # Get Cloudflare URL from snapshot
-        cf_url = getattr(node_snapshot, 'cloudflare_url', None)
-        
-        # Log what we have in the snapshot for debugging
-        LOGGER.info("🔍 [REQUEST START] Node %s snapshot: cloudflare_url=%s (type: %s), ipv4=%s, ipv6=%s", 
-                   node_id, cf_url, type(cf_url).__name__ if cf_url else 'None', node_snapshot.ipv4, node_snapshot.ipv6)
-
-        # Build connection strategies list FRESH - Cloudflare ALWAYS first if available
-        connection_strategies = []
-        
-        # 1. CLOUDFLARE - MUST BE FIRST if available
-        if cf_url and isinstance(cf_url, str) and cf_url.strip():
-            connection_strategies.append("cloudflare")
-            LOGGER.info("✅ [PRIORITY 1] Node %s will try CLOUDFLARE FIRST: %s", node_id, cf_url)
-        else:
-            LOGGER.warning("⚠️  Node %s has NO valid Cloudflare URL (value: %s, type: %s) - skipping Cloudflare", 
-                         node_id, repr(cf_url), type(cf_url).__name__ if cf_url else 'None')
-        
-        # 2. IPv4 - Second priority
-        if node_snapshot.ipv4:
-            connection_strategies.append("ipv4")
-            LOGGER.info("✅ [PRIORITY 2] Node %s will try IPv4: %s", node_id, node_snapshot.ipv4)
-        
-        # 3. IPv6 - Last priority
-        if node_snapshot.ipv6:
-            connection_strategies.append("ipv6")
-
-            LOGGER.info("✅ [PRIORITY 3] Node %s will try IPv6: %s", node_id, node_snapshot.ipv6)
-        
-        LOGGER.info("🎯 [STRATEGY ORDER] Node %s connection strategies (FRESH for this request): %s", node_id, connection_strategies)
+        # Prebuilt on heartbeat in priority order: Cloudflare -> IPv4 -> IPv6.
+        # An immutable tuple, replaced on change, so it is safe to hold on to
+        connection_strategies = entry.strategies
+        debug = LOGGER.isEnabledFor(logging.DEBUG)
+        if debug:
+            LOGGER.debug("🎯 [STRATEGY ORDER] Node %s connection strategies: %s", node_id, connection_strategies)
         
         if not connection_strategies:
+            release_job(node_id)
             raise NodeDispatchError(node_id, "Node has no reachable address (no Cloudflare URL, IPv4, or IPv6)", status_code=503)
 
-        last_error = None
-        for idx, connection_type in enumerate(connection_strategies, 1):
-            try:
-                target_url = build_node_url(node_snapshot, connection_type)
-                LOGGER.info("🚀 [ATTEMPT %d/%d] Dispatching job %s to node %s via %s (%s)", 
-                           idx, len(connection_strategies), payload.job_id, node_id, connection_type.upper(), target_url)
-
-                # Update log entry with node info
-                if log_entry:
-                    log_entry.node_id = node_id
-                    log_entry.ip_version = connection_type.upper()
-                    log_entry.node_url = target_url
-
-                await mark_job_start(node_id)
-                start_time = datetime.now(timezone.utc)
+        # Wait for one of the node's slots; the job already counts in active_jobs
+        try:
+            await asyncio.wait_for(entry.semaphore.acquire(), timeout=NODE_SLOT_TIMEOUT)
+        except asyncio.TimeoutError:
+            # Busy, not failing: leave failure_count alone
+            release_job(node_id)
+            raise NodeDispatchError(node_id, f"No free slot on node within {NODE_SLOT_TIMEOUT:.0f}s", status_code=503)
+        except asyncio.CancelledError:
+            release_job(node_id)
+            raise
+        # Slot and job are released in the finally on every path but a started relay,
+        # which finish_stream releases; that covers a hedge loser cancelled at any
+        # await below. This is the semaphore captured above, so a node re-registered
+        # meanwhile never receives a release it did not hand out
+        relayed = False
+        try:
+            last_error = None
+            for idx, (connection_type, target_url) in enumerate(connection_strategies, 1):
                 try:
-                    response = await http.post(target_url, json=payload.model_dump())
-                except Exception as exc:  # noqa: BLE001
-                    await mark_job_end(node_id, success=False)
-                    last_error = exc
-                    if log_entry:
-                        log_entry.error = str(exc)
-                        log_entry.duration_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
-                    LOGGER.warning("❌ [ATTEMPT %d/%d] Failed to connect via %s (%s): %s - trying next strategy", 
-                                 idx, len(connection_strategies), connection_type, target_url, exc)
-                    # Try next connection strategy
-                    continue
-
-                duration_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
-                success = 200 <= response.status_code < 300
-                await mark_job_end(node_id, success=success)
+                    if debug:
+                        LOGGER.debug("🚀 [ATTEMPT %d/%d] Dispatching job %s to node %s via %s (%s)", 
+                                     idx, len(connection_strategies), payload.job_id, node_id, connection_type, target_url)
 
-                if log_entry:
-                    log_entry.status_code = response.status_code
-                    log_entry.success = success
-                    log_entry.duration_ms = duration_ms
-                    if not success:
-                        log_entry.error = response.text or response.reason_phrase
-
-                if not success:
+                    # Update log entry with node info
+                    if log_entry:
+                        log_entry.node_id = node_id
+                        log_entry.ip_version = connection_type.upper()
+                        log_entry.node_url = target_url
+
+                    start_time = time.perf_counter()
+                    request = http.build_request("POST", target_url, content=payload.body, headers=JSON_HEADERS)
+                    try:
+                        # A cancellation here (lost a hedge) is not the node's fault
+                        response = await http.send(request, stream=True)
+                    except Exception as exc:  # noqa: BLE001
+                        await mark_job_end(node_id, success=False, release=False)
+                        last_error = exc
+                        if log_entry:
+                            log_entry.error = str(exc)
+                            log_entry.duration_ms = (time.perf_counter() - start_time) * 1000.0
+                        LOGGER.warning("❌ [ATTEMPT %d/%d] Failed to connect via %s (%s): %s - trying next strategy", 
+                                     idx, len(connection_strategies), connection_type, target_url, exc)
+                        # Try next connection strategy
+                        continue
+
+                    duration_ms = (time.perf_counter() - start_time) * 1000.0
+                    if 200 <= response.status_code < 300:
+                        # Success: the common case, so it exits before any error handling
+                        if log_entry:
+                            log_entry.status_code = response.status_code
+                            log_entry.success = True
+                            log_entry.duration_ms = duration_ms
+                        if LOGGER.isEnabledFor(logging.INFO):
+                            LOGGER.info("✅ [SUCCESS] Job %s accepted via %s (%s) in %.2fms", 
+                                       payload.job_id, connection_type, target_url, duration_ms)
+                        # Relay the body as it arrives; the job stays active until it is fully sent
+                        relay = NodeRelay(response, functools.partial(finish_stream, node_id, response, entry.semaphore))
+                        relayed = True
+                        return StreamingResponse(
+                            relay,
+                            media_type=response.headers.get("content-type", DEFAULT_MEDIA_TYPE),
+                            status_code=response.status_code,
+                            background=BackgroundTask(relay.finish),
+                        )
+
+                    # Error bodies are small; read them for the log before moving on
+                    try:
+                        await response.aread()
+                    finally:
+                        await response.aclose()
+                    await mark_job_end(node_id, success=False, release=False)
                     message = response.text or response.reason_phrase
+                    if log_entry:
+                        log_entry.status_code = response.status_code
+                        log_entry.success = False
+                        log_entry.duration_ms = duration_ms
+                        log_entry.error = message
                     last_error = Exception(f"HTTP {response.status_code}: {message}")
                     LOGGER.warning("❌ [ATTEMPT %d/%d] HTTP error via %s (%s): %s - trying next strategy", 
                                  idx, len(connection_strategies), connection_type, target_url, message)
                     continue
+                except Exception as exc:  # noqa: BLE001
+                    last_error = exc
+                    if log_entry:
+                        log_entry.error = str(exc)
+                    continue
 
-                # Success!
-                LOGGER.info("✅ [SUCCESS] Job %s completed via %s (%s) in %.2fms", 
-                           payload.job_id, connection_type.upper(), target_url, duration_ms)
-                media_type = response.headers.get("content-type", "application/json")
-                return Response(content=response.content, media_type=media_type, status_code=response.status_code)
-            except Exception as exc:  # noqa: BLE001
-                last_error = exc
-                if log_entry:
-                    log_entry.error = str(exc)
-                continue
-
-        # All strategies failed
-        error_msg = str(last_error) if last_error else "All connection strategies failed"
-        raise NodeDispatchError(node_id, f"Request failed: {error_msg}", status_code=503)
+            # All strategies failed
+            error_msg = str(last_error) if last_error else "All connection strategies failed"
+            raise NodeDispatchError(node_id, f"Request failed: {error_msg}", status_code=503)
+        finally:
+            if not relayed:
+                entry.semaphore.release()
+                release_job(node_id)
+
+    async def discard_response(response: Response) -> None:
+        """Close a node response that will not be relayed (releases the job)."""
+        if response.background:
+            await response.background()
+
+    async def hedge_dispatch(
+        node_ids: List[str],
+        payload: DispatchJob,
+        log_entry: RequestLog,
+        errors: List[Dict[str, Any]],
+        hedge_delay_ms: Optional[float],
+    ) -> Tuple[Optional[Response], RequestLog]:
+        """
+        Dispatch one job to node_ids in order, hedging, and keep the first success.
+
+        The next node is started as soon as an attempt fails and, unless
+        hedge_delay_ms is None, when the newest attempt has not answered within
+        it (0 starts every node up front). A hedge skips nodes with no free slot,
+        since duplicating the job there would only queue it behind the node's
+        other work. Every attempt logs into its own copy of log_entry; the
+        winner's copy is returned. Losing attempts are cancelled (or closed if
+        they also finished).
+        """
+        attempts = {}
+        remaining = list(node_ids)
+
+        # After an up-front fan-out, saturated nodes are left for failover
+        hedge_timeout = hedge_delay_ms / 1000 if hedge_delay_ms else None
+
+        def launch(hedge: bool = False) -> bool:
+            if hedge:
+                registry = registry_snapshot()
+                free = [
+                    node_id for node_id in remaining
+                    if node_id in registry and not registry[node_id].semaphore.locked()
+                ]
+                if not free:
+                    return False
+                node_id = free[0]
+                remaining.remove(node_id)
+            else:
+                node_id = remaining.pop(0)
+            attempt_log = dataclasses.replace(log_entry)
+            task = asyncio.create_task(dispatch_to_node(node_id, payload, log_entry=attempt_log))
+            attempts[task] = attempt_log
+            pending.add(task)
+            return True
+
+        winner: Optional[Response] = None
+        winner_log = log_entry
+        pending = set()
+        launch()
+        if hedge_delay_ms == 0:
+            while remaining and launch(hedge=True):
+                pass
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=hedge_timeout if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Slow to answer: keep waiting on it, but start the next free node too
+                    launch(hedge=True)
+                    continue
+                for task in done:
+                    try:
+                        response = task.result()
+                    except NodeDispatchError as exc:
+                        LOGGER.warning("Node %s failed job %s: %s", exc.node_id, payload.job_id, exc)
+                        errors.append({"node_id": exc.node_id, "message": str(exc), "status": exc.status_code})
+                        if not log_entry.error:
+                            log_entry.error = f"Node {exc.node_id}: {exc}"
+                        if remaining and winner is None:
+                            launch()
+                        continue
+                    if winner is None:
+                        winner, winner_log = response, attempts[task]
+                    else:
+                        await discard_response(response)
+        finally:
+            for task in pending:
+                task.cancel()
+            for result in await asyncio.gather(*pending, return_exceptions=True):
+                if isinstance(result, Response):
+                    await discard_response(result)
+        return winner, winner_log
 
     async def _cleanup_loop(app_: FastAPI) -> None:
         try:
-            ttl = timedelta(seconds=HEARTBEAT_TTL_SECONDS)
-            offline_after = timedelta(seconds=HEARTBEAT_OFFLINE_SECONDS)
+            ttl = HEARTBEAT_TTL_SECONDS
+            offline_after = HEARTBEAT_OFFLINE_SECONDS
+            interval = HEARTBEAT_TTL_SECONDS // 2 or 30
             while True:
-                await asyncio.sleep(HEARTBEAT_TTL_SECONDS // 2 or 30)
-                now = datetime.now(timezone.utc)
+                # Jittered so hub replicas don't wake in lock-step
+                await asyncio.sleep(interval + random.uniform(0, HEARTBEAT_TTL_SECONDS / 10))
+                now = time.monotonic()
+                next_cleanup_at = app_.state.next_cleanup_at
+                if next_cleanup_at is None or now < next_cleanup_at:
+                    continue
+
+                # Scan the current mapping without the lock (nothing here awaits)
+                to_remove = []
+                next_cleanup_at = None
+                for node_id, entry in app_.state.registry.items():
+                    delta = now - entry.last_seen_mono
+                    if delta > offline_after:
+                        to_remove.append(node_id)
+                        continue
+                    if delta > ttl and entry.status != "offline":
+                        LOGGER.warning("Marking node %s offline after %.0fs without heartbeat", node_id, delta)
+                        entry.status = "offline"
+                    deadline = entry.last_seen_mono + (offline_after if entry.status == "offline" else ttl)
+                    if next_cleanup_at is None or deadline < next_cleanup_at:
+                        next_cleanup_at = deadline
+                app_.state.next_cleanup_at = next_cleanup_at
+                if not to_remove:
+                    continue
+
+                # One locked write for every eviction in this pass
                 async with app_.state.registry_lock:
-                    for node_id, entry in list(app_.state.registry.items()):
-                        delta = now - entry.record.last_seen
-                        if delta > offline_after:
-                            LOGGER.warning("Removing node %s after %s without heartbeat", node_id, delta)
-                            app_.state.registry.pop(node_id)
+                    registry = dict(app_.state.registry)
+                    now = time.monotonic()
+                    for node_id in to_remove:
+                        entry = registry.get(node_id)
+                        # A heartbeat may have arrived while we waited for the lock
+                        if entry is None or now - entry.last_seen_mono <= offline_after:
                             continue
-                        if delta > ttl and entry.record.status != "offline":
-                            LOGGER.warning("Marking node %s offline after %s without heartbeat", node_id, delta)
-                            entry.record = entry.record.copy(update={"status": "offline"})
+                        LOGGER.warning("Removing node %s after %.0fs without heartbeat", node_id, now - entry.last_seen_mono)
+                        registry.pop(node_id)
+                        reindex_node(node_id, entry.record.models, ())
+                    if len(registry) != len(app_.state.registry):
+                        publish_registry(registry)
         except asyncio.CancelledError:  # pragma: no cover - shutdown behaviour
             LOGGER.debug("Cleanup loop cancelled")
 
@@ -400,7 +733,6 @@ def create_app() -> FastAPI:
         # This is the IP the server can actually connect back to
         connection_ip = request.client.host if request.client else None
 
-        payload_data = payload.model_dump()
         node_id = payload.node_id
 
         # Store the connection IP as the primary reachable address
@@ -409,29 +741,47 @@ def create_app() -> FastAPI:
         # - Different networks: connection IP is the public/NAT IP
         # - NAT scenarios: connection IP is the externally reachable IP
         # - IPv6: connection IP is the IPv6 address
+        # The payload is already validated, so model_copy swaps the field without re-validating
         if connection_ip:
             if ":" not in connection_ip:
                 # IPv4 connection - use as primary IPv4
-                payload_data["ipv4"] = connection_ip
                 LOGGER.debug("Node %s connection IPv4: %s (client reported: %s)", 
-                           node_id, connection_ip, payload_data.get("ipv4"))
+                           node_id, connection_ip, payload.ipv4)
+                payload = payload.model_copy(update={"ipv4": connection_ip})
             else:
                 # IPv6 connection - use as primary IPv6
-                payload_data["ipv6"] = connection_ip
                 LOGGER.debug("Node %s connection IPv6: %s (client reported: %s)", 
-                           node_id, connection_ip, payload_data.get("ipv6"))
-
-        payload = HeartbeatPayload(**payload_data)
+                           node_id, connection_ip, payload.ipv6)
+                payload = payload.model_copy(update={"ipv6": connection_ip})
+
+        def apply_heartbeat(entry: NodeState) -> None:
+            reindex_node(node_id, entry.record.models, payload.models)
+            entry.bump_heartbeat(payload)
+            LOGGER.debug("✅ Updated heartbeat for node %s (Cloudflare: %s, IPv4: %s, IPv6: %s)", 
+                         node_id, payload.cloudflare_url, payload.ipv4, payload.ipv6)
+
+        # Known node: only its own lock is needed
+        entry = app.state.registry.get(node_id)
+        if entry:
+            async with entry.lock:
+                # Cleanup may have evicted it while we waited
+                if app.state.registry.get(node_id) is entry:
+                    apply_heartbeat(entry)
+                    return {"node_id": node_id, "status": "ok"}
 
         async with app.state.registry_lock:
             entry = app.state.registry.get(node_id)
             if entry:
-                entry.bump_heartbeat(payload)
-                LOGGER.info("✅ Updated heartbeat for node %s (Cloudflare: %s, IPv4: %s, IPv6: %s)", 
-                           node_id, payload.cloudflare_url, payload.ipv4, payload.ipv6)
+                apply_heartbeat(entry)
             else:
-                record = NodeInfo(**payload.model_dump(exclude_none=False), last_seen=datetime.now(timezone.utc), status="online")
-                app.state.registry[node_id] = NodeState(record=record)
+                # payload is already validated; build the record without re-validating it
+                record = NodeInfo.model_construct(**dict(payload), last_seen=datetime.now(timezone.utc), status="online")
+                entry = NodeState(record=record)
+                publish_registry({**app.state.registry, node_id: entry})
+                deadline = entry.last_seen_mono + HEARTBEAT_TTL_SECONDS
+                if app.state.next_cleanup_at is None or deadline < app.state.next_cleanup_at:
+                    app.state.next_cleanup_at = deadline
+                reindex_node(node_id, (), payload.models)
                 LOGGER.info("Registered new node %s (Cloudflare: %s, IPv4: %s, IPv6: %s, connection: %s)", 
                           node_id, payload.cloudflare_url, payload.ipv4, payload.ipv6, connection_ip)
 
@@ -439,10 +789,11 @@ def create_app() -> FastAPI:
 
     @app.get("/nodes")
     async def list_nodes(request: Request) -> Response:
-        snapshot = await registry_snapshot()
+        snapshot = registry_snapshot()
         nodes_list = [state.to_dict() for state in snapshot.values()]
-        LOGGER.info("📋 [GET /nodes] Returning %d node(s): %s", 
-                   len(nodes_list), [n.get("node_id") for n in nodes_list])
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("📋 [GET /nodes] Returning %d node(s): %s", 
+                         len(nodes_list), [n.get("node_id") for n in nodes_list])
         
         # Add cache-busting headers to prevent browser caching
         headers = {
@@ -451,28 +802,28 @@ def create_app() -> FastAPI:
             "Expires": "0"
         }
         
-        # Convert datetime objects to ISO strings for JSON serialization
-        def serialize_datetime(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
-        
-        return Response(
-            content=json.dumps(nodes_list, default=serialize_datetime),
-            media_type="application/json",
-            headers=headers
-        )
+        # orjson serializes datetimes as ISO 8601 natively
+        return ORJSONResponse(nodes_list, headers=headers)
 
     @app.get("/nodes/{node_id}")
-    async def get_node(node_id: str) -> Dict[str, object]:
-        async with app.state.registry_lock:
-            entry = app.state.registry.get(node_id)
-            if not entry:
-                raise HTTPException(status_code=404, detail="Node not found")
-            return entry.to_dict()
+    async def get_node(node_id: str) -> ORJSONResponse:
+        entry = registry_snapshot().get(node_id)
+        if not entry:
+            raise HTTPException(status_code=404, detail="Node not found")
+        return ORJSONResponse(entry.to_dict())
 
     @app.post("/jobs")
-    async def create_job(request_payload: JobRequest, request: Request) -> Response:
+    async def create_job(request: Request) -> Response:
+        # The request task also sends the relayed body, so tracking it covers the whole job
+        task = asyncio.current_task()
+        app.state.inflight.add(task)
+        task.add_done_callback(app.state.inflight.discard)
+
+        # Only the routing fields are checked; the body is forwarded to the node as-is
+        raw = await request.body()
+        job_request = parse_job_request(raw)
+        model = job_request["model"]
+
         # Create log entry for this request
         request_ip = request.client.host if request.client else "unknown"
         log_entry = RequestLog(
@@ -480,33 +831,41 @@ def create_app() -> FastAPI:
             request_ip=request_ip,
             endpoint="/jobs",
             method="POST",
-            request_json=request_payload.model_dump(),
+            request_json=job_request,
         )
 
-        candidate_ids = await choose_node_ids(request_payload.model)
+        candidate_ids = await choose_node_ids(model)
         if not candidate_ids:
             log_entry.error = "No healthy nodes available for requested model"
             log_entry.status_code = 503
-            async with app.state.logs_lock:
-                app.state.request_logs.append(log_entry)
+            app.state.request_logs.append(log_entry)
             raise HTTPException(status_code=503, detail="No healthy nodes available for requested model")
 
         job_id = str(uuid4())
-        dispatch_payload = JobDispatchPayload(
-            job_id=job_id,
-            model=request_payload.model,
-            prompt=request_payload.prompt,
-            options=request_payload.options,
-            stream=request_payload.stream,
-        )
+        if "job_id" in job_request:
+            # Ours must win; a spliced duplicate key would leave the caller's in place
+            body = orjson.dumps({**job_request, "job_id": job_id})
+        else:
+            body = build_dispatch_body(job_id, raw)
+        dispatch_payload = DispatchJob(job_id=job_id, body=body)
 
         errors = []
+        if len(candidate_ids) > 1 and JOB_FANOUT > 1:
+            # A slow first choice shouldn't cost a full timeout before the next is tried
+            hedge_delay_ms = STREAM_HEDGE_DELAY_MS if job_request.get("stream", True) else HEDGE_DELAY_MS
+            response, winner_log = await hedge_dispatch(
+                candidate_ids[:JOB_FANOUT], dispatch_payload, log_entry, errors, hedge_delay_ms
+            )
+            if response is not None:
+                app.state.request_logs.append(winner_log)
+                return response
+            candidate_ids = candidate_ids[JOB_FANOUT:]
+
         for node_id in candidate_ids:
             try:
                 response = await dispatch_to_node(node_id, dispatch_payload, log_entry=log_entry)
                 # Log successful request
-                async with app.state.logs_lock:
-                    app.state.request_logs.append(log_entry)
+                app.state.request_logs.append(log_entry)
                 return response
             except NodeDispatchError as exc:
                 LOGGER.warning("Node %s failed job %s: %s", exc.node_id, job_id, exc)
@@ -519,8 +878,7 @@ def create_app() -> FastAPI:
         # All nodes failed
         log_entry.error = f"All candidate nodes failed: {errors}"
         log_entry.status_code = 503
-        async with app.state.logs_lock:
-            app.state.request_logs.append(log_entry)
+        app.state.request_logs.append(log_entry)
         
         detail = {
             "message": "All candidate nodes failed to execute the job",
@@ -530,12 +888,11 @@ def create_app() -> FastAPI:
         raise HTTPException(status_code=503, detail=detail)
 
     @app.get("/logs")
-    async def get_logs(limit: int = 100) -> List[Dict[str, Any]]:
+    async def get_logs(limit: int = 100) -> ORJSONResponse:
         """Get request logs for debugging and monitoring."""
-        async with app.state.logs_lock:
-            # Return most recent logs (deque is already in order)
-            logs = list(app.state.request_logs)[-limit:]
-            return [log.to_dict() for log in reversed(logs)]  # Most recent first
+        # orjson serializes the slotted dataclasses natively; returned directly so
+        # FastAPI skips jsonable_encoder on the nested request_json
+        return ORJSONResponse(app.state.request_logs.latest(limit))  # Most recent first
 
     @app.get("/healthz")
     async def healthcheck() -> Dict[str, str]:  # pragma: no cover - trivial endpoint
@@ -555,3 +912,16 @@ def create_app() -> FastAPI:
 app = create_app()
 
 
+if __name__ == "__main__":  # pragma: no cover - manual entrypoint
+    import uvicorn
+
+    # The registry lives in process memory, so extra workers would each see a
+    # different subset of nodes; scale the hub by running one worker per instance
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )